@@ -1,6 +1,7 @@
 from __future__ import absolute_import, unicode_literals
 import os
 from celery import Celery
+from celery.signals import worker_init
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ocel_mining_tool.settings')
 
@@ -9,3 +10,10 @@ app = Celery('ocel_mining_tool')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
 app.autodiscover_tasks()
+
+
+@worker_init.connect
+def clear_stale_metrics(**kwargs):
+    # Before the pool processes start recording samples.
+    from process_mining.metrics import clear_stale_samples
+    clear_stale_samples()
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -31,7 +32,55 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
 
+CORS_ALLOW_HEADERS = (*default_headers, "upload-offset", "upload-checksum", "x-profile")
+
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+UPLOAD_ROOT = os.path.join(MEDIA_ROOT, 'uploads')
+
+# Stored logs (Arrow tables) and discovered models, shared by the web and worker containers.
+ARTIFACT_STORAGE_ROOT = os.environ.get('ARTIFACT_STORAGE_ROOT', os.path.join(MEDIA_ROOT, 'artifacts'))
+
+# Codec new artifacts are written with: none, zlib, lzma, or zstd and lz4 when the zstandard and lz4 packages are
+# installed. zstd and lz4 also compress the Arrow tables of the stored OCELs.
+ARTIFACT_CODEC = os.environ.get('ARTIFACT_CODEC', 'none')
+
+# OCDFG discovery: pandas computes the model with vectorized operations on the relations, pm4py with pm4py's own
+# discovery. Both give the same model, the benchmark command checks it.
+OCDFG_ENGINE = os.environ.get('OCDFG_ENGINE', 'pandas')
+
+# Fraction of the objects of every type sampled by the approximate discovery of large logs.
+APPROXIMATE_SAMPLE_FRACTION = float(os.environ.get('APPROXIMATE_SAMPLE_FRACTION', 0.05))
+
+# Appends whose objects hold a larger share of the relations of the log are rediscovered from scratch rather than
+# incrementally.
+INCREMENTAL_DISCOVERY_MAX_SHARE = float(os.environ.get('INCREMENTAL_DISCOVERY_MAX_SHARE', 0.3))
+
+# Size of the process pool mining the object types of an OCPN in parallel (1 mines them in-process).
+OCPN_DISCOVERY_PROCESSES = int(os.environ.get('OCPN_DISCOVERY_PROCESSES', os.cpu_count() or 1))
+
+# Upper bound (in bytes of estimated memory use) of the per-worker cache of deserialized logs and models.
+ARTIFACT_CACHE_MAX_BYTES = int(os.environ.get('ARTIFACT_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+
+# Rendered graphs, shared by all workers through the media volume.
+RENDER_CACHE_ROOT = os.path.join(MEDIA_ROOT, 'render_cache')
+RENDER_CACHE_MAX_BYTES = int(os.environ.get('RENDER_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+# Storage quotas in bytes, 0 disables them. Uploads beyond the quota of their user are rejected; above the global
+# quota the least recently used discovered models and renderings are evicted (and rediscovered on access) in the
+# background, and uploads are rejected when that would not be enough. The global usage is the one recorded by the
+# storage sweep and the last eviction.
+STORAGE_USER_QUOTA_BYTES = int(os.environ.get('STORAGE_USER_QUOTA_BYTES', 0))
+STORAGE_GLOBAL_QUOTA_BYTES = int(os.environ.get('STORAGE_GLOBAL_QUOTA_BYTES', 0))
+
+# Artifacts and uploads nothing refers to are removed by the storage sweep once older than this many seconds.
+STORAGE_ORPHAN_MIN_AGE = int(os.environ.get('STORAGE_ORPHAN_MIN_AGE', 60 * 60 * 6))
+
+# Prometheus metrics of the mining pipeline stages, only served to these addresses.
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+
+# Requests sent with "X-Profile: 1" are profiled when enabled, the cProfile dumps are written to PROFILE_ROOT.
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+PROFILE_ROOT = os.path.join(MEDIA_ROOT, 'profiles')
 
 # Application definition
 
@@ -55,9 +104,14 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
+    # Chunked uploads started per hour by a user, or by an address for anonymous uploads.
+    'DEFAULT_THROTTLE_RATES': {
+        'chunked_upload': os.environ.get('CHUNKED_UPLOAD_RATE', '30/hour'),
+    },
 }
 
 MIDDLEWARE = [
+    'django.middleware.gzip.GZipMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -66,6 +120,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'process_mining.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'ocel_mining_tool.urls'
@@ -90,6 +145,27 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'ocel_mining_tool.wsgi.application'
 
+# Celery
+# Parsing, discovery and rendering of uploaded logs run on the Celery workers.
+
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://redis:6379/0')
+CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'redis://redis:6379/0')
+CELERY_TASK_TRACK_STARTED = True
+CELERY_RESULT_EXPIRES = 60 * 60 * 24
+CELERY_BEAT_SCHEDULE = {
+    'sweep-storage': {
+        'task': 'process_mining.tasks.sweep_storage',
+        'schedule': 60 * 60,
+    },
+}
+
+# Chunked uploads are parsed on a worker from the received prefix while the rest of the file is still arriving, for
+# at most CHUNKED_UPLOAD_MAX_STREAMING uploads at once. The worker gives the upload up when no chunk arrives for
+# CHUNKED_UPLOAD_IDLE_TIMEOUT seconds, it is then parsed once completed.
+CHUNKED_UPLOAD_STREAM_PARSING = os.environ.get('CHUNKED_UPLOAD_STREAM_PARSING', 'true').lower() == 'true'
+CHUNKED_UPLOAD_MAX_STREAMING = int(os.environ.get('CHUNKED_UPLOAD_MAX_STREAMING', 2))
+CHUNKED_UPLOAD_IDLE_TIMEOUT = int(os.environ.get('CHUNKED_UPLOAD_IDLE_TIMEOUT', 60))
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -18,16 +18,28 @@ from django.contrib import admin
 from django.urls import path
 
 from users.views import UserLoginView, UserSignupView
-from process_mining.views import UploadOCELFileView, ApplyFilterView, UserFilesView, RetrieveFileView
+from process_mining.views import UploadOCELFileView, UploadStatusView, ChunkedUploadView, ChunkedUploadChunkView, \
+    ChunkedUploadCompleteView, ApplyFilterView, ThresholdStepsView, UserFilesView, RetrieveFileView, CacheStatsView, \
+    MetricsView, AppendOCELFileView, CompareOCDFGView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('upload/', UploadOCELFileView.as_view(), name='upload-ocel-file'),
+    path('upload/chunked/', ChunkedUploadView.as_view(), name='chunked-upload'),
+    path('upload/chunked/<uuid:upload_id>/', ChunkedUploadChunkView.as_view(), name='chunked-upload-chunk'),
+    path('upload/chunked/<uuid:upload_id>/complete/', ChunkedUploadCompleteView.as_view(),
+         name='chunked-upload-complete'),
+    path('upload/<str:job_id>/status/', UploadStatusView.as_view(), name='upload-status'),
     path("signup/", UserSignupView.as_view(), name="sign-up"),
     path("login/", UserLoginView.as_view(), name="log-in"),
     path("filters/", ApplyFilterView.as_view(), name="filtering"),
+    path("thresholds/", ThresholdStepsView.as_view(), name="threshold-steps"),
+    path("compare/", CompareOCDFGView.as_view(), name="compare-ocdfg"),
     path('api/user-files/', UserFilesView.as_view(), name='user-files'),
     path('api/files/<int:file_id>/', RetrieveFileView.as_view(), name='retrieve-file'),
     path('api/files/<int:file_id>/', RetrieveFileView.as_view(), name='file-detail'),
+    path('api/files/<int:file_id>/append/', AppendOCELFileView.as_view(), name='append-file'),
+    path('api/cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
 
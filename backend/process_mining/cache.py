@@ -0,0 +1,218 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .storage import file_version, memory_size, touch
+
+logger = logging.getLogger(__name__)
+
+
+class ArtifactCache:
+    """
+    Per-worker LRU cache of deserialized artifacts (OCEL, OCDFG, OCPN), keyed by FileMetadata id and artifact path
+    and bounded by the estimated memory size of the cached values. Entries remember the version (inode and
+    modification time) of the file they were loaded from and are reloaded once it changes, so that replacements and
+    deletions made by other processes are noticed without invalidation.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_load(self, file_id, path, loader):
+        key = (file_id, path)
+        stat = os.stat(path)
+        version = file_version(stat)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = loader(path)
+        self._put(key, value, memory_size(value, stat.st_size), version)
+        return value
+
+    def _put(self, key, value, size, version):
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size, version)
+            self._size += size
+
+            while self._size > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, file_id, path_prefix=None):
+        """
+        Drops the entries of the file, only the ones of the artifacts under path_prefix if given.
+        """
+        with self._lock:
+            for key in [key for key in self._entries
+                        if key[0] == file_id and (path_prefix is None or key[1].startswith(path_prefix))]:
+                self._size -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'size_bytes': self._size,
+                'max_bytes': self.max_bytes,
+            }
+
+
+artifact_cache = ArtifactCache(settings.ARTIFACT_CACHE_MAX_BYTES)
+
+
+def _read_text(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def canonical_filters(filters):
+    canonical = {}
+    for key, value in filters.items():
+        if key == "selected_objects":
+            value = sorted(value) if value else None
+        elif key.endswith("_percent"):
+            value = float(value)
+        canonical[key] = value
+    return canonical
+
+
+class RenderCache:
+    """
+    Disk-backed cache of rendered graphs, and of the models discovered on time windows, addressed by the hash of the
+    visualization type and of the normalized filters, and stored per FileMetadata id. The directory is bounded by
+    max_bytes, evicting the least recently read renderings first. Hits are additionally kept in memory through the
+    artifact cache, which reloads a rendering once its file is replaced.
+    """
+
+    # Eviction goes below the bound by this share of it, so that the directory is not scanned on every write.
+    EVICTION_MARGIN = 0.1
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Running total of the size of the directory, from a scan and the writes and purges of this process since.
+        self._size = None
+        self._lock = threading.Lock()
+
+    def _path(self, file_id, visualization, filters):
+        key = json.dumps({"visualization": visualization, "filters": canonical_filters(filters)}, sort_keys=True)
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, str(file_id), digest)
+
+    def get(self, file_id, visualization, filters, loader=_read_text):
+        path = self._path(file_id, visualization, filters)
+        try:
+            touch(path)
+            content = artifact_cache.get_or_load(file_id, path, loader)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return content
+
+    def put(self, file_id, visualization, filters, content):
+        path = self._path(file_id, visualization, filters)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if isinstance(content, bytes):
+            f = tempfile.NamedTemporaryFile("wb", dir=os.path.dirname(path), delete=False)
+        else:
+            f = tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=os.path.dirname(path), delete=False)
+        with f:
+            f.write(content)
+        try:
+            replaced = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(f.name, path)
+        artifact_cache.invalidate(file_id, path)
+
+        with self._lock:
+            if self._size is not None:
+                self._size += os.path.getsize(path) - replaced
+            if self._size is None or self._size > self.max_bytes:
+                self._evict()
+
+    def _scan(self, directory=None):
+        entries = []
+        for dirpath, _, filenames in os.walk(directory or self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_atime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        """
+        Rescans the directory, which also accounts for the writes of the other processes, and evicts the least
+        recently read renderings down to the bound minus the margin when it is exceeded.
+        """
+        entries = self._scan()
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_bytes:
+            target = self.max_bytes * (1 - self.EVICTION_MARGIN)
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self.evictions += 1
+        self._size = total
+
+    def purge(self, file_id):
+        directory = os.path.join(self.root, str(file_id))
+        removed = sum(size for _, size, _ in self._scan(directory))
+        shutil.rmtree(directory, ignore_errors=True)
+        artifact_cache.invalidate(file_id, directory)
+        with self._lock:
+            if self._size is not None:
+                self._size = max(0, self._size - removed)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'max_bytes': self.max_bytes,
+        }
+
+
+render_cache = RenderCache(settings.RENDER_CACHE_ROOT, settings.RENDER_CACHE_MAX_BYTES)
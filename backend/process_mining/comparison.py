@@ -0,0 +1,242 @@
+import numpy as np
+import pandas as pd
+from graphviz import Digraph
+from pm4py.util.vis_utils import human_readable_stat
+from pm4py.visualization.ocel.ocdfg.variants.classic import ot_to_color
+
+from .ocdfg import ACTIVITY_METRICS, PERFORMANCE_MEASURES, apply_layout
+
+EDGE_KEYS = ["object_type", "kind", "source", "target"]
+STATUSES = ("added", "removed", "changed", "unchanged")
+STATUS_COLORS = {"added": "#2e7d32", "removed": "#c62828"}
+STATUS_FILL_COLORS = {"added": "#c8e6c9", "removed": "#ffcdd2", "changed": "#fff9c4", "unchanged": "white"}
+
+
+def _aggregate_sorted(groups, measure):
+    """
+    Performance measure of every sorted array of durations, as aggregate_durations computes it for one, over their
+    concatenation at once. Empty arrays give NaN.
+    """
+    lengths = np.fromiter((len(group) for group in groups), dtype=np.int64, count=len(groups))
+    result = np.full(len(groups), np.nan)
+    present = np.flatnonzero(lengths)
+    if len(present) == 0:
+        return result
+
+    values = np.concatenate([groups[i] for i in present])
+    lengths = lengths[present]
+    offsets = np.r_[0, np.cumsum(lengths)[:-1]]
+    if measure == "mean":
+        result[present] = np.add.reduceat(values, offsets) / lengths
+    elif measure == "max":
+        result[present] = values[offsets + lengths - 1]
+    else:
+        # Linear interpolation between the closest ranks, as np.percentile.
+        position = (lengths - 1) * (0.5 if measure == "median" else 0.95)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, lengths - 1)
+        low, high = values[offsets + lower], values[offsets + upper]
+        result[present] = low + (high - low) * (position - lower)
+    return result
+
+
+def first_difference(expected, actual, path=()):
+    """
+    Path of the first value of the actual OCDFG differing from the expected one, or None if they are identical.
+    """
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        if set(expected) != set(actual):
+            return path + (sorted(map(str, set(expected) ^ set(actual)))[0],)
+        for key in expected:
+            difference = first_difference(expected[key], actual[key], path + (key,))
+            if difference is not None:
+                return difference
+        return None
+    if isinstance(expected, np.ndarray) or isinstance(actual, np.ndarray):
+        return None if np.array_equal(expected, actual) else path
+    return None if expected == actual else path
+
+
+def activity_frame(ocdfg, act_metric):
+    counts = ocdfg["activities_indep"][act_metric]
+    return pd.DataFrame({
+        "activity": list(counts),
+        "frequency": np.fromiter(counts.values(), dtype=np.int64, count=len(counts)),
+    })
+
+
+def edge_frame(ocdfg, act_metric, edge_metric, performance_measure):
+    """
+    One row per directly-follows edge of every object type with its frequency and performance, and per start and end
+    activity of every object type with its frequency. Start edges have no source and end edges no target.
+    """
+    performance_metric = "total_objects" if edge_metric == "total_objects" else "event_couples"
+    performance = ocdfg["edges_performance"].get(performance_metric, {})
+
+    rows = []
+    durations = []
+    for ot, edges in ocdfg["edges"][edge_metric].items():
+        for (source, target), count in edges.items():
+            rows.append((ot, "flow", source, target, count))
+            durations.append(performance.get(ot, {}).get((source, target), ()))
+    for kind, key in (("start", "start_activities"), ("end", "end_activities")):
+        for ot, activities in ocdfg[key][act_metric].items():
+            for act, count in activities.items():
+                rows.append((ot, kind, "" if kind == "start" else act, act if kind == "start" else "", count))
+                durations.append(())
+
+    frame = pd.DataFrame(rows, columns=EDGE_KEYS + ["frequency"]).astype({"frequency": np.int64})
+    frame["duration"] = _aggregate_sorted(durations, performance_measure)
+    return frame
+
+
+def _join(base, other, keys):
+    """
+    Outer join of the frames of the two models on the keys, with the changes of the second model relative to the
+    first one and the status of every row.
+    """
+    joined = base.merge(other, on=keys, how="outer", suffixes=("_base", "_other"), indicator=True)
+    present = joined.pop("_merge").to_numpy()
+    for column in ("frequency_base", "frequency_other"):
+        joined[column] = joined[column].fillna(0).astype(np.int64)
+
+    base_frequency = joined["frequency_base"].to_numpy()
+    joined["frequency_delta"] = joined["frequency_other"].to_numpy() - base_frequency
+    with np.errstate(divide="ignore", invalid="ignore"):
+        joined["frequency_change"] = np.where(base_frequency > 0, joined["frequency_delta"] / base_frequency, np.nan)
+
+    changed = joined["frequency_delta"].to_numpy() != 0
+    if "duration_base" in joined:
+        joined["duration_delta"] = joined["duration_other"] - joined["duration_base"]
+        changed |= joined["duration_delta"].fillna(0).to_numpy() != 0
+
+    joined["status"] = np.select([present == "left_only", present == "right_only", changed], STATUSES[:3],
+                                 STATUSES[3])
+    return joined.sort_values(keys, ignore_index=True)
+
+
+def compare_ocdfgs(base, other, annotation_type="unique_objects", performance_measure="mean"):
+    """
+    Aligns the activities and the edges of every object type of two compact OCDFGs and computes the frequency
+    changes, for the given metric, and the performance changes of the second one relative to the first one.
+    """
+    if annotation_type not in ACTIVITY_METRICS:
+        raise ValueError("Invalid activity metric")
+    if performance_measure not in PERFORMANCE_MEASURES:
+        raise ValueError("Invalid performance measure")
+    edge_metric = "event_couples" if annotation_type == "events" else annotation_type
+
+    return {
+        "annotation_type": annotation_type,
+        "performance_measure": performance_measure,
+        "object_types": sorted(set(base["object_types"]) | set(other["object_types"])),
+        "activities": _join(activity_frame(base, annotation_type), activity_frame(other, annotation_type),
+                            ["activity"]),
+        "edges": _join(edge_frame(base, annotation_type, edge_metric, performance_measure),
+                       edge_frame(other, annotation_type, edge_metric, performance_measure), EDGE_KEYS),
+    }
+
+
+def _optional(value):
+    return None if pd.isna(value) else float(value)
+
+
+def _frequency(row):
+    return {
+        "base": int(row.frequency_base),
+        "other": int(row.frequency_other),
+        "delta": int(row.frequency_delta),
+        "change": _optional(row.frequency_change),
+    }
+
+
+def _frequency_label(row):
+    if row.status == "added":
+        return f"new {row.frequency_other}"
+    if row.status == "removed":
+        return f"removed {row.frequency_base}"
+    label = f"{row.frequency_base} → {row.frequency_other}"
+    if row.frequency_delta:
+        label += f" ({row.frequency_delta:+d}"
+        if not pd.isna(row.frequency_change):
+            label += f", {row.frequency_change:+.0%}"
+        label += ")"
+    return label
+
+
+def _duration_label(row, measure):
+    if pd.isna(row.duration_base) or pd.isna(row.duration_other):
+        duration = row.duration_other if pd.isna(row.duration_base) else row.duration_base
+        return f"{measure} {human_readable_stat(duration)}"
+    sign = "-" if row.duration_delta < 0 else "+"
+    return (f"{measure} {human_readable_stat(row.duration_base)} → {human_readable_stat(row.duration_other)} "
+            f"({sign}{human_readable_stat(abs(row.duration_delta))})")
+
+
+def diff_graph(diff, rankdir="LR"):
+    """
+    Graphviz graph of a comparison, along with its nodes and edges described as in to_graph_json: activities are
+    filled and edges colored by their status, and labelled with their frequency and performance changes.
+    """
+    graph = Digraph("ocdfg_diff", graph_attr={"rankdir": rankdir, "bgcolor": "white"},
+                    node_attr={"shape": "box", "style": "filled"})
+    nodes = []
+    edges = []
+    node_ids = {}
+
+    for row in diff["activities"].itertuples(index=False):
+        node_id = f"a{len(nodes)}"
+        node_ids[row.activity] = node_id
+        nodes.append({"id": node_id, "kind": "activity", "label": row.activity, "status": row.status,
+                      "frequency": _frequency(row)})
+        graph.node(node_id, label=f"{row.activity}\n{_frequency_label(row)}",
+                   fillcolor=STATUS_FILL_COLORS[row.status], color=STATUS_COLORS.get(row.status, "black"))
+
+    edge_rows = diff["edges"]
+    bounds = set(zip(edge_rows["kind"], edge_rows["object_type"]))
+    for ot in diff["object_types"]:
+        color = ot_to_color(ot)
+        for kind in ("start", "end"):
+            if (kind, ot) not in bounds:
+                continue
+            node_id = f"{kind[0]}{len(nodes)}"
+            node_ids[(kind, ot)] = node_id
+            nodes.append({"id": node_id, "kind": kind, "label": ot, "object_type": ot, "color": color})
+            graph.node(node_id, label=ot, shape="ellipse" if kind == "start" else "underline", fillcolor=color,
+                       fontcolor="white")
+
+    for row in edge_rows.itertuples(index=False):
+        source = node_ids[("start", row.object_type)] if row.kind == "start" else node_ids[row.source]
+        target = node_ids[("end", row.object_type)] if row.kind == "end" else node_ids[row.target]
+        edge = {"id": f"e{len(edges)}", "object_type": row.object_type, "source": source, "target": target,
+                "status": row.status, "frequency": _frequency(row)}
+        label = f"{row.object_type} {_frequency_label(row)}"
+        if row.kind == "flow" and not (pd.isna(row.duration_base) and pd.isna(row.duration_other)):
+            edge["duration"] = {"base": _optional(row.duration_base), "other": _optional(row.duration_other),
+                                "delta": _optional(row.duration_delta)}
+            label += f"\n{_duration_label(row, diff['performance_measure'])}"
+        edges.append(edge)
+        graph.edge(source, target, label=label, color=STATUS_COLORS.get(row.status, ot_to_color(row.object_type)),
+                   style="dashed" if row.status == "removed" else "solid",
+                   penwidth="2" if row.status in ("added", "changed") else "1")
+
+    return graph, nodes, edges
+
+
+def to_diff_graph_json(diff, rankdir="LR"):
+    graph, nodes, edges = diff_graph(diff, rankdir)
+    width, height = apply_layout(graph, nodes, edges)
+    return {
+        "annotation_type": diff["annotation_type"],
+        "performance_measure": diff["performance_measure"],
+        "object_types": diff["object_types"],
+        "colors": {ot: ot_to_color(ot) for ot in diff["object_types"]},
+        "width": width,
+        "height": height,
+        "nodes": nodes,
+        "edges": edges,
+        "summary": {
+            key: {status: int(count) for status, count in diff[key]["status"].value_counts().items()}
+            for key in ("activities", "edges")
+        },
+    }
@@ -0,0 +1,60 @@
+import functools
+import gzip
+import lzma
+
+from django.conf import settings
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+
+class Codec:
+    """
+    Streaming compression of the pickled artifacts. The codec is recognized from the suffix it adds to the artifact
+    path; arrow_compression is the compression the Arrow tables of a stored OCEL are written with under the codec.
+    """
+
+    def __init__(self, name, suffix, opener, arrow_compression="uncompressed"):
+        self.name = name
+        self.suffix = suffix
+        self.arrow_compression = arrow_compression
+        self._opener = opener
+
+    def open(self, path, mode="rb"):
+        return self._opener(path, mode)
+
+
+CODECS = {
+    "none": Codec("none", "", open),
+    # DEFLATE, the zlib algorithm, in a gzip container.
+    "zlib": Codec("zlib", ".gz", functools.partial(gzip.open, compresslevel=6)),
+    "lzma": Codec("lzma", ".xz", lzma.open),
+}
+if zstandard is not None:
+    CODECS["zstd"] = Codec("zstd", ".zst", zstandard.open, arrow_compression="zstd")
+if lz4 is not None:
+    CODECS["lz4"] = Codec("lz4", ".lz4", lz4.frame.open, arrow_compression="lz4")
+
+
+def get_codec(name=None):
+    """
+    The codec of the given name, by default the one configured by ARTIFACT_CODEC.
+    """
+    name = name or settings.ARTIFACT_CODEC
+    if name not in CODECS:
+        raise ValueError(f"Unknown or unavailable artifact codec '{name}', available: {', '.join(CODECS)}")
+    return CODECS[name]
+
+
+def codec_for_path(path):
+    for codec in CODECS.values():
+        if codec.suffix and path.endswith(codec.suffix):
+            return codec
+    return CODECS["none"]
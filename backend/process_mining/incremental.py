@@ -0,0 +1,193 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from pm4py.objects.ocel.obj import OCEL
+
+from .ocdfg import COUNT_KEYS, compact_ocdfg, frequency_index, is_compact, mine_ocdfg, _activity_signatures
+
+
+def _concat(first, second):
+    if second is None or second.empty:
+        return first
+    if first is None or first.empty:
+        return second
+    return pd.concat([first, second], ignore_index=True)
+
+
+def merge_delta(ocel, delta):
+    """
+    Appends to the log the events of the delta log it does not contain yet, along with their relations and the
+    objects it does not know yet; known objects keep their type. Returns the merged log and the delta restricted to
+    the appended events, or None if there is none.
+
+    The events of an object must not precede its last event in the log, otherwise the delta is not an append and a
+    ValueError is raised.
+    """
+    events = delta.events[~delta.events[ocel.event_id_column].isin(ocel.events[ocel.event_id_column])]
+    if events.empty:
+        return ocel, None
+
+    objects = delta.objects[~delta.objects[ocel.object_id_column].isin(ocel.objects[ocel.object_id_column])]
+    types = pd.concat([ocel.objects, objects]).set_index(ocel.object_id_column)[ocel.object_type_column]
+    relations = delta.relations[delta.relations[ocel.event_id_column].isin(events[ocel.event_id_column])].copy()
+    relations[ocel.object_type_column] = relations[ocel.object_id_column].map(types)
+
+    previous = ocel.relations[ocel.relations[ocel.object_id_column].isin(relations[ocel.object_id_column])]
+    last_seen = previous.groupby(ocel.object_id_column)[ocel.event_timestamp].max()
+    first_new = relations.groupby(ocel.object_id_column)[ocel.event_timestamp].min()
+    common = last_seen.index.intersection(first_new.index)
+    if (first_new.reindex(common).to_numpy() < last_seen.reindex(common).to_numpy()).any():
+        raise ValueError("The delta has events preceding events already recorded for their objects")
+
+    o2o = delta.o2o[delta.o2o[ocel.object_id_column].isin(objects[ocel.object_id_column])]
+    object_changes = delta.object_changes[
+        delta.object_changes[ocel.object_id_column].isin(objects[ocel.object_id_column])]
+
+    merged = OCEL(events=_concat(ocel.events, events), objects=_concat(ocel.objects, objects),
+                  relations=_concat(ocel.relations, relations), o2o=_concat(ocel.o2o, o2o), e2e=ocel.e2e,
+                  object_changes=_concat(ocel.object_changes, object_changes), globals=ocel.globals)
+    appended = OCEL(events=events.reset_index(drop=True), objects=objects.reset_index(drop=True),
+                    relations=relations.reset_index(drop=True), globals=ocel.globals)
+    return merged, appended
+
+
+def history_share(ocel, appended):
+    """
+    Share of the relations of the log that belong to objects the appended events relate to, i.e. the part of the log
+    an incremental update rediscovers (twice).
+    """
+    if ocel.relations.empty:
+        return 1.0
+    affected = ocel.relations[ocel.object_id_column].isin(appended.relations[ocel.object_id_column].unique())
+    return float(affected.mean())
+
+
+def _object_history(ocel, merged, object_ids, appended=None):
+    """
+    Sub-log of the given objects: their events in the log, followed by the appended ones, with only their relations.
+    """
+    relations = ocel.relations[ocel.relations[ocel.object_id_column].isin(object_ids)]
+    events = ocel.events[ocel.events[ocel.event_id_column].isin(relations[ocel.event_id_column])]
+    if appended is not None:
+        relations = _concat(relations, appended.relations)
+        events = _concat(events, appended.events)
+    objects = merged.objects[merged.objects[ocel.object_id_column].isin(object_ids)]
+    if events.empty:
+        return None
+    return OCEL(events=events, objects=objects, relations=relations, globals=ocel.globals)
+
+
+def _apply_difference(counts, before, after, correction):
+    """
+    counts - |before| + |after| + correction for every leaf of the nested dicts of counts and identifier sets,
+    dropping the leaves that fall to zero.
+    """
+    updated = {}
+    for key in set(counts) | set(before) | set(after):
+        if isinstance(counts.get(key, after.get(key, before.get(key))), dict):
+            updated[key] = _apply_difference(counts.get(key, {}), before.get(key, {}), after.get(key, {}),
+                                             correction.get(key, {}))
+        else:
+            count = (counts.get(key, 0) - len(before.get(key, ())) + len(after.get(key, ()))
+                     + correction.get(key, 0))
+            if count:
+                updated[key] = count
+    return updated
+
+
+def _end_correction(ocel, affected, before, after):
+    """
+    The end events of the affected objects that the appended events supersede are still end events when another,
+    unaffected, object of the same type ends there. Counts them per object type and activity.
+    """
+    superseded = {
+        (ot, act): events - after.get(ot, {}).get(act, set())
+        for ot, activities in before.items() for act, events in activities.items()
+    }
+    superseded = {key: events for key, events in superseded.items() if events}
+    if not superseded:
+        return {}
+
+    event_ids = set().union(*superseded.values())
+    relations = ocel.relations
+    candidates = relations[relations[ocel.event_id_column].isin(event_ids) &
+                           ~relations[ocel.object_id_column].isin(affected)][ocel.object_id_column].unique()
+    history = relations[relations[ocel.object_id_column].isin(candidates)]
+    last = history.groupby(ocel.object_id_column).last()
+    still_ending = set(zip(last[ocel.object_type_column], last[ocel.event_id_column]))
+
+    correction = {}
+    for (ot, act), events in superseded.items():
+        count = sum(1 for ev in events if (ot, ev) in still_ending)
+        if count:
+            correction.setdefault(ot, {})[act] = count
+    return correction
+
+
+def _added_durations(before, after, timestamps):
+    durations = {}
+    for ot, edges in after.items():
+        for edge, elements in edges.items():
+            added = elements - before.get(ot, {}).get(edge, set())
+            if added:
+                durations.setdefault(ot, {})[edge] = np.array(
+                    [(timestamps[el[1]] - timestamps[el[0]]) / np.timedelta64(1, "s") for el in added], dtype=float)
+    return durations
+
+
+def _empty_ocdfg():
+    return {key: {} for key in COUNT_KEYS + ("edges_performance",)} | {"activities": set()}
+
+
+def update_ocdfg(ocdfg, ocel, merged, appended):
+    """
+    Updates the OCDFG of the log to the merged log, as a compact OCDFG; the OCDFG discovered by pm4py, which files
+    processed before the compact OCDFG still hold, is compacted first. Only the history of the objects the appended
+    events relate to is rediscovered, before and after the append: its identifier sets are subtracted from the counts,
+    and the ones of the extended history added.
+
+    Objects are not shared, so this is exact for the object metrics. For the event metrics an appended event relates
+    to affected objects only and the events of the affected objects only move out of the end activities, where the
+    ones that still end an unaffected object are counted back in.
+    """
+    if not is_compact(ocdfg):
+        ocdfg = compact_ocdfg(ocdfg)
+
+    affected = appended.relations[ocel.object_id_column].unique()
+    history_before = _object_history(ocel, merged, affected)
+    history_after = _object_history(ocel, merged, affected, appended)
+    before = mine_ocdfg(history_before) if history_before is not None else _empty_ocdfg()
+    after = mine_ocdfg(history_after)
+
+    updated = {
+        "activities": set(ocdfg["activities"]) | set(after["activities"]),
+        "object_types": set(ocdfg["object_types"]) | set(appended.objects[ocel.object_type_column].unique()),
+    }
+
+    corrections = {"end_activities": {"events": _end_correction(ocel, affected, before["end_activities"].get(
+        "events", {}), after["end_activities"]["events"])}}
+    for key in COUNT_KEYS:
+        updated[key] = _apply_difference(ocdfg[key], before.get(key, {}), after[key], corrections.get(key, {}))
+
+    timestamps = history_after.events.set_index(ocel.event_id_column)[ocel.event_timestamp].to_dict()
+    updated["edges_performance"] = {}
+    for metric, per_type in ocdfg["edges_performance"].items():
+        added = _added_durations(before.get("edges", {}).get(metric, {}), after["edges"][metric], timestamps)
+        updated["edges_performance"][metric] = {ot: dict(edges) for ot, edges in per_type.items()}
+        for ot, edges in added.items():
+            current = updated["edges_performance"][metric].setdefault(ot, {})
+            for edge, durations in edges.items():
+                current[edge] = np.sort(np.concatenate([current.get(edge, np.empty(0)), durations]))
+
+    signatures = {act: Counter(counts) for act, counts in ocdfg["activity_signatures"].items()}
+    for act, counts in _activity_signatures(after).items():
+        signatures.setdefault(act, Counter()).update(counts)
+    if history_before is not None:
+        for act, counts in _activity_signatures(before).items():
+            signatures[act].subtract(counts)
+    updated["activity_signatures"] = {act: {signature: count for signature, count in counts.items() if count}
+                                      for act, counts in signatures.items()}
+
+    updated["frequency_index"] = frequency_index(updated)
+    return updated
@@ -0,0 +1,285 @@
+import fcntl
+import json
+import logging
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import artifact_cache, render_cache
+from .models import FileMetadata, UploadSession
+from .storage import artifact_size, remove_artifact
+
+logger = logging.getLogger(__name__)
+
+# Discovered models, rebuilt from the stored log on their next access when they have been evicted. The logs
+# themselves (ocel_path) are never evicted.
+DERIVED_FIELDS = ("ocdfg_path", "ocpn_path")
+PATH_FIELDS = ("ocel_path",) + DERIVED_FIELDS
+
+# Under MEDIA_ROOT, shared by the web and worker processes.
+USAGE_FILE = "storage_usage.json"
+EVICTION_LOCK_FILE = "storage_eviction.lock"
+
+
+def _size(path):
+    try:
+        return artifact_size(path)
+    except FileNotFoundError:
+        return 0
+
+
+def _referenced(paths):
+    """
+    The given paths that a FileMetadata still refers to, in a single query.
+    """
+    paths = [path for path in paths if path]
+    condition = Q()
+    for field in PATH_FIELDS:
+        condition |= Q(**{f"{field}__in": paths})
+    referenced = set()
+    for row in FileMetadata.objects.filter(condition).values_list(*PATH_FIELDS):
+        referenced.update(row)
+    return referenced
+
+
+def remove_unreferenced(paths):
+    """
+    Removes the artifacts among paths that no FileMetadata refers to.
+    """
+    paths = {path for path in paths if path}
+    for path in paths - _referenced(paths):
+        try:
+            remove_artifact(path)
+        except OSError as e:
+            logger.error(f"Error deleting artifact {path}: {e}")
+
+
+def delete_files(queryset):
+    """
+    Deletes the files of the queryset with a single query, then their cached renderings and the artifacts that no
+    remaining file shares. Returns the number of deleted files.
+    """
+    rows = list(queryset.values_list("id", *PATH_FIELDS))
+    if not rows:
+        return 0
+
+    FileMetadata.objects.filter(id__in=[row[0] for row in rows]).delete()
+    for file_id, *_ in rows:
+        artifact_cache.invalidate(file_id)
+        render_cache.purge(file_id)
+    remove_unreferenced(path for row in rows for path in row[1:])
+    return len(rows)
+
+
+def delete_expired_uploads(max_age=timedelta(hours=24)):
+    """
+    Deletes the files uploaded anonymously and the upload sessions older than max_age.
+    """
+    cutoff = timezone.now() - max_age
+    deleted = delete_files(FileMetadata.objects.filter(username__isnull=True, uploaded_at__lt=cutoff))
+
+    sessions = UploadSession.objects.filter(created_at__lt=cutoff)
+    upload_paths = list(sessions.values_list("upload_path", flat=True))
+    sessions.delete()
+    for path in upload_paths:
+        remove_artifact(path)
+    return deleted
+
+
+def sweep_orphans(min_age=None):
+    """
+    Removes the artifacts and uploads that nothing refers to, such as the ones of an upload that failed before its
+    FileMetadata was created, and the renderings of deleted files. Uploads keep an UploadSession until their job has
+    processed them. Entries younger than min_age seconds are left alone, as the task that wrote them may still be
+    running. Returns the number of bytes reclaimed.
+    """
+    if min_age is None:
+        min_age = settings.STORAGE_ORPHAN_MIN_AGE
+    cutoff = time.time() - min_age
+
+    referenced = set()
+    for row in FileMetadata.objects.values_list(*PATH_FIELDS):
+        referenced.update(os.path.normpath(path) for path in row if path)
+    referenced.update(os.path.normpath(path) for path in UploadSession.objects.values_list("upload_path", flat=True))
+
+    reclaimed = 0
+    for root in (settings.ARTIFACT_STORAGE_ROOT, settings.UPLOAD_ROOT):
+        if not os.path.isdir(root):
+            continue
+        for entry in os.scandir(root):
+            if os.path.normpath(entry.path) in referenced:
+                continue
+            try:
+                if entry.stat().st_mtime > cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            reclaimed += _size(entry.path)
+            remove_artifact(entry.path)
+            logger.info(f"Removed orphaned artifact {entry.path}")
+
+    if os.path.isdir(render_cache.root):
+        file_ids = {str(file_id) for file_id in FileMetadata.objects.values_list("id", flat=True)}
+        for entry in os.scandir(render_cache.root):
+            if entry.is_dir() and entry.name not in file_ids:
+                render_cache.purge(entry.name)
+    return reclaimed
+
+
+def files_usage(queryset):
+    """
+    Bytes of the distinct artifacts the files of the queryset refer to.
+    """
+    paths = set()
+    for row in queryset.values_list(*PATH_FIELDS):
+        paths.update(path for path in row if path)
+    return sum(_size(path) for path in paths)
+
+
+def _tree_size(root):
+    total = 0
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            try:
+                total += os.stat(os.path.join(dirpath, filename)).st_size
+            except FileNotFoundError:
+                pass
+    return total
+
+
+def storage_usage():
+    """
+    Bytes used by the stored logs and models, the uploads and the rendering cache.
+    """
+    return sum(_tree_size(root) for root in (settings.ARTIFACT_STORAGE_ROOT, settings.UPLOAD_ROOT, render_cache.root))
+
+
+def _evictable():
+    """
+    The derived artifacts and the cached renderings, as (last access, size, path, field) with field None for
+    renderings. Artifacts are touched when loaded and renderings when read, so their atime is their last access.
+    """
+    entries = []
+    for field in DERIVED_FIELDS:
+        paths = FileMetadata.objects.filter(**{f"{field}__isnull": False}).values_list(field, flat=True).distinct()
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path, field))
+
+    for dirpath, _, filenames in os.walk(render_cache.root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path, None))
+    return entries
+
+
+def evict_derived(max_bytes):
+    """
+    Evicts the least recently used derived artifacts and renderings until the storage usage is at most max_bytes, or
+    nothing evictable is left. The files referring to an evicted model are updated in bulk and rediscover it on their
+    next access. Returns the storage usage afterwards and the bytes that are still evictable.
+    """
+    usage = storage_usage()
+    entries = sorted(_evictable(), key=lambda entry: entry[0])
+    evictable = sum(entry[1] for entry in entries)
+
+    for _, size, path, field in entries:
+        if usage <= max_bytes:
+            break
+        if field is not None:
+            updates = {field: None}
+            if field == "ocdfg_path":
+                # The rediscovered OCDFG is the exact one.
+                updates["ocdfg_approximate"] = False
+            FileMetadata.objects.filter(**{field: path}).update(**updates)
+        try:
+            remove_artifact(path)
+        except FileNotFoundError:
+            continue
+        usage -= size
+        evictable -= size
+        logger.info(f"Evicted {path} ({size} bytes)")
+    return usage, evictable
+
+
+def _record_usage(usage, evictable):
+    os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+    path = os.path.join(settings.MEDIA_ROOT, USAGE_FILE)
+    with open(f"{path}.{os.getpid()}", "w") as f:
+        json.dump({"usage": usage, "evictable": evictable, "recorded_at": time.time()}, f)
+    os.replace(f"{path}.{os.getpid()}", path)
+
+
+def recorded_usage():
+    """
+    Storage usage and evictable bytes recorded by the last eviction, as a dict, or None if none was recorded.
+    """
+    try:
+        with open(os.path.join(settings.MEDIA_ROOT, USAGE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def enforce_global_quota(incoming_bytes=0):
+    """
+    Evicts derived artifacts until incoming_bytes more fit in the global storage quota, then records the storage usage
+    for the quota checks of the uploads. Evictions run one at a time across processes. Returns the storage usage, or
+    None without a global quota.
+    """
+    quota = settings.STORAGE_GLOBAL_QUOTA_BYTES
+    if not quota:
+        return None
+
+    os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+    with open(os.path.join(settings.MEDIA_ROOT, EVICTION_LOCK_FILE), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        usage, evictable = evict_derived(max(0, quota - incoming_bytes))
+        _record_usage(usage, evictable)
+    return usage
+
+
+def exceeds_user_quota(user, incoming_bytes):
+    """
+    Whether incoming_bytes more would exceed the storage quota of the user.
+    """
+    quota = settings.STORAGE_USER_QUOTA_BYTES
+    if user is None or not quota:
+        return False
+    return files_usage(FileMetadata.objects.filter(username=user)) + incoming_bytes > quota
+
+
+def exceeds_global_quota(incoming_bytes):
+    """
+    Whether incoming_bytes more would exceed the global storage quota even once the derived artifacts are evicted,
+    according to the usage recorded by the last eviction. The uploads stored since then are not counted until the
+    next one.
+    """
+    quota = settings.STORAGE_GLOBAL_QUOTA_BYTES
+    recorded = recorded_usage()
+    if not quota or recorded is None:
+        return False
+    return recorded["usage"] - recorded["evictable"] + incoming_bytes > quota
+
+
+def needs_eviction(incoming_bytes):
+    """
+    Whether derived artifacts have to be evicted for incoming_bytes more to fit in the global storage quota, according
+    to the usage recorded by the last eviction, or whether no usage was recorded yet.
+    """
+    quota = settings.STORAGE_GLOBAL_QUOTA_BYTES
+    if not quota:
+        return False
+    recorded = recorded_usage()
+    return recorded is None or recorded["usage"] + incoming_bytes > quota
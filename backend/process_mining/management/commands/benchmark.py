@@ -0,0 +1,283 @@
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+import pm4py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+
+from ocel_mining_tool.celery import app as celery_app
+from process_mining.cache import artifact_cache, render_cache
+from process_mining.comparison import first_difference
+from process_mining.compression import CODECS
+from process_mining.models import FileMetadata
+from process_mining.ocdfg import compact_ocdfg, edge_durations
+from process_mining.ocdfg_engines import OCDFG_ENGINES
+from process_mining.storage import store_ocel, load_ocel, remove_artifact, artifact_size
+from process_mining.synthetic import WRITERS
+from process_mining.timeindex import build_time_index, time_window
+from process_mining.utils import read_ocel_file, discover, serialize_in_file, deserialize_file, \
+    compute_percentage_thresholds, compute_threshold_steps, filter_ocel_ocdfg, filter_ocel_ocpn, discover_ocdfg, \
+    discover_oc_petri_net, DEFAULT_OCDFG_FILTERS
+
+
+def _time(fn, repeat, setup=None):
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - started)
+
+    return {
+        "runs": runs,
+        "min": min(runs),
+        "median": statistics.median(runs),
+        "mean": statistics.mean(runs),
+        "max": max(runs),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ("Times the stages of the mining pipeline and the upload and filter views on synthetic OCEL 1.0/2.0 logs, "
+            "writes the results as JSON and flags regressions against a baseline.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=10000)
+        parser.add_argument("--objects", type=int, default=2000)
+        parser.add_argument("--object-types", type=int, default=4)
+        parser.add_argument("--activities", type=int, default=10)
+        parser.add_argument("--density", type=float, default=2.0,
+                            help="Average number of objects related to an event.")
+        parser.add_argument("--formats", nargs="+", choices=sorted(WRITERS), default=sorted(WRITERS))
+        parser.add_argument("--codecs", nargs="+", choices=sorted(CODECS), default=sorted(CODECS),
+                            help="Artifact codecs whose size and (de)serialization time are measured.")
+        parser.add_argument("--engines", nargs="+", choices=sorted(OCDFG_ENGINES), default=sorted(OCDFG_ENGINES),
+                            help="OCDFG engines timed and checked to discover the same model as pm4py.")
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--skip-views", action="store_true",
+                            help="Do not time the /upload/ and /filters/ views, which need a test database.")
+        parser.add_argument("--output", help="Path of the JSON results (default: benchmark-<timestamp>.json).")
+        parser.add_argument("--compare", help="JSON results of a previous run to compare against.")
+        parser.add_argument("--tolerance", type=float, default=0.25,
+                            help="Relative slowdown of a stage median over the baseline reported as a regression.")
+
+    def handle(self, *args, **options):
+        workdir = tempfile.mkdtemp(prefix="ocpm-benchmark-")
+        render_root = render_cache.root
+        render_cache.root = os.path.join(workdir, "render_cache")
+        try:
+            with override_settings(ARTIFACT_STORAGE_ROOT=os.path.join(workdir, "artifacts"),
+                                   UPLOAD_ROOT=os.path.join(workdir, "uploads")):
+                results = {fmt: self._run_format(fmt, workdir, options) for fmt in options["formats"]}
+        finally:
+            render_cache.root = render_root
+            artifact_cache.clear()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        report = {
+            "meta": {
+                "created_at": datetime.now().isoformat(),
+                "git_commit": _git_commit(),
+                "python": platform.python_version(),
+                "pm4py": pm4py.__version__,
+                "ocdfg_engine": settings.OCDFG_ENGINE,
+                "platform": platform.platform(),
+                "parameters": {key: options[key] for key in ("events", "objects", "object_types", "activities",
+                                                              "density", "repeat", "seed")},
+            },
+            "results": results,
+        }
+
+        output = options["output"] or f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+
+        for fmt, stages in results.items():
+            for stage, timing in stages.items():
+                size = f"  {timing['bytes']:>12} bytes" if "bytes" in timing else ""
+                self.stdout.write(f"{fmt:6} {stage:28} median {timing['median']:9.4f}s  min {timing['min']:9.4f}s{size}")
+        self.stdout.write(f"Results written to {output}")
+
+        if options["compare"]:
+            self._compare(results, options["compare"], options["tolerance"])
+
+    def _run_format(self, fmt, workdir, options):
+        repeat = options["repeat"]
+        path = os.path.join(workdir, f"synthetic-{fmt}.jsonocel")
+        WRITERS[fmt](path, options["events"], options["objects"], options["object_types"], options["activities"],
+                     options["density"], options["seed"])
+
+        results = {}
+        results["read"] = _time(lambda: read_ocel_file(path), repeat)
+        ocel = read_ocel_file(path)
+
+        stored = []
+        results["store_ocel"] = _time(lambda: stored.append(store_ocel(ocel)), repeat)
+        results["store_ocel"]["bytes"] = artifact_size(stored[0])
+        results["load_ocel"] = _time(lambda: load_ocel(stored[0]), repeat)
+
+        # A window over the middle tenth of the log.
+        index = build_time_index(ocel)
+        timestamps = index["event_timestamps"]
+        window = (timestamps[len(timestamps) * 9 // 20], timestamps[len(timestamps) * 11 // 20])
+        results["build_time_index"] = _time(lambda: build_time_index(ocel), repeat)
+        results["time_window"] = _time(lambda: time_window(ocel, index, *window), repeat)
+
+        results["edge_durations"] = _time(lambda: edge_durations(ocel), repeat)
+        results["discover_ocdfg"] = _time(lambda: discover(ocel, True), repeat)
+        results.update(self._time_engines(fmt, ocel, options["engines"], repeat))
+        ocdfg = discover(ocel, True)
+        results["discover_ocpn"] = _time(lambda: discover(ocel, False), repeat)
+        ocpn = discover(ocel, False)
+
+        serialized = []
+        results["serialize_ocdfg"] = _time(lambda: serialized.append(serialize_in_file(ocdfg)), repeat)
+        results["serialize_ocdfg"]["bytes"] = artifact_size(serialized[0])
+        results["deserialize_ocdfg"] = _time(lambda: deserialize_file(serialized[0]), repeat)
+        results.update(self._time_codecs(ocel, ocdfg, options["codecs"], repeat))
+
+        def thresholds():
+            for percent in range(101):
+                compute_percentage_thresholds(ocdfg, percent, percent, "unique_objects", "unique_objects")
+
+        results["thresholds_x101"] = _time(thresholds, repeat)
+        results["threshold_steps"] = _time(
+            lambda: compute_threshold_steps(ocdfg, range(101), "unique_objects", "unique_objects"), repeat)
+
+        def render_ocdfg():
+            parameters, model = filter_ocel_ocdfg(ocel, ocdfg, DEFAULT_OCDFG_FILTERS)
+            discover_ocdfg(model, parameters)
+
+        def render_ocpn():
+            parameters, model = filter_ocel_ocpn(ocel, ocpn)
+            discover_oc_petri_net(model, parameters)
+
+        results["render_ocdfg"] = _time(render_ocdfg, repeat)
+        results["render_ocpn"] = _time(render_ocpn, repeat)
+
+        for artifact_path in stored + serialized:
+            remove_artifact(artifact_path)
+
+        if not options["skip_views"]:
+            results.update(self._time_views(path, repeat))
+
+        return results
+
+    def _time_engines(self, fmt, ocel, engines, repeat):
+        """
+        Times every OCDFG engine and checks that its model is identical to the one of pm4py's own discovery, edge
+        durations included.
+        """
+        expected = compact_ocdfg(pm4py.discover_ocdfg(ocel))
+        results = {}
+        for name in engines:
+            engine = OCDFG_ENGINES[name]
+            results[f"discover_ocdfg_{name}"] = _time(lambda: engine(ocel), repeat)
+            difference = first_difference(expected, engine(ocel))
+            if difference is not None:
+                raise CommandError(f"The {name} engine differs from pm4py on the {fmt} log at "
+                                   f"{'/'.join(map(str, difference))}")
+        return results
+
+    def _time_codecs(self, ocel, ocdfg, codecs, repeat):
+        """
+        Times writing and reading the OCDFG, and the OCEL tables for the codecs with an Arrow counterpart, under every
+        codec, along with the size of the artifacts.
+        """
+        results = {}
+        for name in codecs:
+            paths = []
+            results[f"serialize_ocdfg_{name}"] = _time(lambda: paths.append(serialize_in_file(ocdfg, name)), repeat)
+            results[f"serialize_ocdfg_{name}"]["bytes"] = artifact_size(paths[0])
+            results[f"deserialize_ocdfg_{name}"] = _time(lambda: deserialize_file(paths[0]), repeat)
+
+            if CODECS[name].arrow_compression != "uncompressed":
+                stored = []
+                results[f"store_ocel_{name}"] = _time(lambda: stored.append(store_ocel(ocel, name)), repeat)
+                results[f"store_ocel_{name}"]["bytes"] = artifact_size(stored[0])
+                results[f"load_ocel_{name}"] = _time(lambda: load_ocel(stored[0]), repeat)
+                paths += stored
+
+            for artifact_path in paths:
+                remove_artifact(artifact_path)
+        return results
+
+    def _time_views(self, path, repeat):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        always_eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        try:
+            client = APIClient()
+
+            def reset():
+                # Deleting the previous uploads keeps the content hash deduplication from short-cutting the upload.
+                for file_metadata in FileMetadata.objects.all():
+                    render_cache.purge(file_metadata.id)
+                    file_metadata.delete()
+                artifact_cache.clear()
+
+            def upload():
+                with open(path, "rb") as f:
+                    response = client.post("/upload/", {"file": f}, format="multipart")
+                if response.status_code != 202:
+                    raise CommandError(f"/upload/ answered {response.status_code}")
+
+            results = {"view_upload": _time(upload, repeat, setup=reset)}
+            file_metadata = FileMetadata.objects.latest("id")
+
+            def filters(visualization_type):
+                response = client.post("/filters/", {"visualizationType": visualization_type,
+                                                     "file_metadata_id": file_metadata.id}, format="json")
+                if response.status_code != 200:
+                    raise CommandError(f"/filters/ answered {response.status_code}")
+
+            results["view_filters_ocdfg"] = _time(lambda: filters("ocdfg"), repeat,
+                                                  setup=lambda: render_cache.purge(file_metadata.id))
+            results["view_filters_ocdfg_cached"] = _time(lambda: filters("ocdfg"), repeat)
+            results["view_filters_ocpn"] = _time(lambda: filters("ocpn"), repeat,
+                                                 setup=lambda: render_cache.purge(file_metadata.id))
+            reset()
+            return results
+        finally:
+            celery_app.conf.task_always_eager = always_eager
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def _compare(self, results, baseline_path, tolerance):
+        with open(baseline_path) as f:
+            baseline = json.load(f)["results"]
+
+        regressions = []
+        for fmt, stages in results.items():
+            for stage, timing in stages.items():
+                reference = baseline.get(fmt, {}).get(stage)
+                if reference is None:
+                    continue
+                ratio = timing["median"] / reference["median"] if reference["median"] else 1
+                if ratio > 1 + tolerance:
+                    regressions.append(f"{fmt} {stage}: {reference['median']:.4f}s -> {timing['median']:.4f}s "
+                                       f"(x{ratio:.2f})")
+
+        if regressions:
+            raise CommandError("Regressions over the baseline:\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS(f"No stage is more than {tolerance:.0%} slower than {baseline_path}"))
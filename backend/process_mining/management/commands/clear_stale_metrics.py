@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from process_mining.metrics import clear_stale_samples
+
+
+class Command(BaseCommand):
+    help = ("Removes the metric samples left in PROMETHEUS_MULTIPROC_DIR by the previous processes of this host. Run "
+            "it before the web server starts, not from its workers, which would remove the samples of their siblings.")
+
+    def handle(self, *args, **options):
+        clear_stale_samples()
@@ -0,0 +1,147 @@
+import glob
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager, suppress
+
+# In multiprocess mode (web and Celery workers) every process writes its samples under PROMETHEUS_MULTIPROC_DIR, in
+# files named after its host as well, since the containers share the directory and their process ids overlap.
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+HOST = socket.gethostname()
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+from prometheus_client import CollectorRegistry, Histogram, REGISTRY, generate_latest, multiprocess, values
+
+if MULTIPROC_DIR:
+    values.ValueClass = values.MultiProcessValue(lambda: f"{HOST}_{os.getpid()}")
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+MEMORY_BUCKETS = tuple(1024 * 1024 * 4 ** i for i in range(8))
+SIZE_BUCKETS = tuple(10 ** i for i in range(1, 9))
+
+STAGE_DURATION = Histogram("ocpm_stage_duration_seconds", "Duration of a mining pipeline stage", ["stage"],
+                           buckets=DURATION_BUCKETS)
+STAGE_MEMORY = Histogram("ocpm_stage_peak_memory_delta_bytes",
+                         "Peak resident memory of the process during a stage above the one at its start", ["stage"],
+                         buckets=MEMORY_BUCKETS)
+STAGE_INPUT = {
+    key: Histogram(f"ocpm_stage_input_{key}", f"Number of {key.replace('_', ' ')} processed by a stage", ["stage"],
+                   buckets=SIZE_BUCKETS)
+    for key in ("events", "objects", "object_types")
+}
+
+
+def ocel_size(ocel):
+    return {
+        "events": len(ocel.events),
+        "objects": len(ocel.objects),
+        "object_types": ocel.objects[ocel.object_type_column].nunique(),
+    }
+
+
+# [resident memory at the start, peak resident memory so far, whether the peak was reset] of the running stages, of
+# every thread.
+_running_stages = {}
+_stages_lock = threading.Lock()
+
+
+def _memory():
+    """
+    Current and peak resident memory of the process in bytes, or None where /proc is not available.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            status = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return None
+    return int(status["VmRSS"].split()[0]) * 1024, int(status["VmHWM"].split()[0]) * 1024
+
+
+def _reset_peak():
+    # Resets the peak resident memory of the process to the current one (Linux 4.0+).
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _start_stage(key):
+    with _stages_lock:
+        memory = _memory()
+        if memory is None:
+            return
+        resident, peak = memory
+        # The peak is reset for the new stage, so the stages running meanwhile keep the one reached so far.
+        for stage in _running_stages.values():
+            if stage[2]:
+                stage[1] = max(stage[1], peak)
+        _running_stages[key] = [resident, resident, _reset_peak()]
+
+
+def _end_stage(key):
+    """
+    Peak resident memory of the process during the stage above the one at its start, or None if it is unknown.
+    """
+    with _stages_lock:
+        stage = _running_stages.pop(key, None)
+        memory = _memory()
+        if stage is None or memory is None:
+            return None
+        resident, peak = memory
+        return max(stage[1], peak if stage[2] else resident) - stage[0]
+
+
+@contextmanager
+def timed_stage(stage, sizes=None):
+    """
+    Measures the duration and the peak memory growth of a stage of the pipeline. The yielded dict holds the input
+    size (events, objects, object_types) and can be completed inside the block.
+
+    Memory is the resident memory of the whole process, so it includes the stages that other threads run at the same
+    time. Without a resettable peak (outside Linux containers) it is only sampled at the start and the end.
+    """
+    sizes = dict(sizes or {})
+    key = object()
+    _start_stage(key)
+    started = time.perf_counter()
+    try:
+        yield sizes
+    finally:
+        duration = time.perf_counter() - started
+        memory_delta = _end_stage(key)
+        STAGE_DURATION.labels(stage).observe(duration)
+        if memory_delta is not None:
+            STAGE_MEMORY.labels(stage).observe(memory_delta)
+        for key, value in sizes.items():
+            if key in STAGE_INPUT:
+                STAGE_INPUT[key].labels(stage).observe(value)
+        logger.debug(f"Stage {stage} took {duration:.3f}s, peak memory +{memory_delta} bytes, input {sizes}")
+
+
+def clear_stale_samples():
+    """
+    Removes the samples left in PROMETHEUS_MULTIPROC_DIR by the previous processes of this host. Called once when the
+    web server (the clear_stale_metrics command of its entrypoint) or a Celery worker starts, before its processes
+    fork and record any.
+    """
+    if not MULTIPROC_DIR:
+        return
+    for path in glob.glob(os.path.join(glob.escape(MULTIPROC_DIR), f"*_{glob.escape(HOST)}_*.db")):
+        with suppress(FileNotFoundError):
+            os.remove(path)
+
+
+def render_metrics():
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
@@ -0,0 +1,31 @@
+import cProfile
+import os
+import re
+import time
+
+from django.conf import settings
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the requests sent with the "X-Profile: 1" header when PROFILING_ENABLED is set, dumping the cProfile
+    statistics in PROFILE_ROOT. The name of the dump is returned in the X-Profile-File response header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.PROFILING_ENABLED or request.headers.get("X-Profile") != "1":
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        response = profiler.runcall(self.get_response, request)
+
+        os.makedirs(settings.PROFILE_ROOT, exist_ok=True)
+        path = re.sub(r"[^\w]+", "-", request.path).strip("-") or "root"
+        file_name = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{path}.prof"
+        profiler.dump_stats(os.path.join(settings.PROFILE_ROOT, file_name))
+
+        response["X-Profile-File"] = file_name
+        return response
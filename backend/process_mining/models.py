@@ -1,8 +1,10 @@
-import os
+import uuid
 
 from django.db import models
+from django.db.models import Q
 
 from users.models import User
+from .storage import remove_artifact
 
 
 class FileMetadata(models.Model):
@@ -13,16 +15,72 @@ class FileMetadata(models.Model):
     ocdfg_path = models.CharField(max_length=255, null=True, blank=True)
     ocpn_path = models.CharField(max_length=255, null=True, blank=True)
     object_types = models.JSONField(null=True, blank=True)
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    ocdfg_approximate = models.BooleanField(default=False)
+    artifact_codec = models.CharField(max_length=16, default="none")
 
     def __str__(self):
         return self.file_name
 
-    def delete(self, *args, **kwargs):
-        for path_field in [self.ocel_path, self.ocdfg_path, self.ocpn_path]:
-            if path_field and os.path.isfile(path_field):
-                try:
-                    os.remove(path_field)
-                except Exception as e:
-                    print(f"Error deleting file {path_field}: {e}")
+    def set_artifact_path(self, field, path):
+        """
+        Records a newly discovered artifact, sharing it with the files of identical content that lack it.
+        """
+        setattr(self, field, path)
+        self.save()
+        if self.content_hash:
+            FileMetadata.objects.filter(content_hash=self.content_hash, **{f"{field}__isnull": True}) \
+                .update(**{field: path})
+
+    def _remove_unreferenced(self, paths):
+        others = FileMetadata.objects.exclude(pk=self.pk)
+        for path_field in paths:
+            if not path_field:
+                continue
+            if others.filter(Q(ocel_path=path_field) | Q(ocdfg_path=path_field) | Q(ocpn_path=path_field)).exists():
+                continue
+            try:
+                remove_artifact(path_field)
+            except Exception as e:
+                print(f"Error deleting file {path_field}: {e}")
+
+    def release_artifacts(self):
+        """
+        Removes the stored artifacts of this file that no other file refers to.
+        """
+        self._remove_unreferenced([self.ocel_path, self.ocdfg_path, self.ocpn_path])
 
+    def replace_artifacts(self, **paths):
+        """
+        Points this file to new artifacts and removes the previous ones that no other file refers to.
+        """
+        previous = [getattr(self, field) for field in paths]
+        for field, path in paths.items():
+            setattr(self, field, path)
+        self.save()
+        self._remove_unreferenced(previous)
+
+    def delete(self, *args, **kwargs):
+        self.release_artifacts()
         super().delete(*args, **kwargs)
+
+
+class UploadSession(models.Model):
+    """
+    Chunked upload in progress. Chunks are appended to upload_path, offset is the number of bytes received so far.
+    Completed uploads, and the files uploaded in a single request, keep a completed session until their job has
+    processed them, so that the storage sweep does not take them for orphans.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file_name = models.CharField(max_length=255)
+    username = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    upload_path = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    job_id = models.CharField(max_length=255, null=True, blank=True)
+    approximate = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.file_name
@@ -0,0 +1,370 @@
+import json
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from graphviz import Digraph
+from pm4py.algo.discovery.ocel.ocdfg import algorithm as ocdfg_discovery
+from pm4py.visualization.ocel.ocdfg.variants.classic import ot_to_color
+
+from .sampling import error_bound
+from .timeindex import nanoseconds
+
+COUNT_KEYS = ("edges", "activities_indep", "activities_ot", "start_activities", "end_activities")
+OBJECT_TYPE_KEYS = ("edges", "activities_ot", "start_activities", "end_activities", "edges_performance")
+ACTIVITY_METRICS = ("events", "unique_objects", "total_objects")
+EDGE_METRICS = ("event_couples", "unique_objects", "total_objects")
+PERFORMANCE_METRICS = ("event_couples", "total_objects")
+PERFORMANCE_MEASURES = ("mean", "median", "p95", "max")
+
+
+def _count(values):
+    if isinstance(values, dict):
+        return {key: _count(value) for key, value in values.items()}
+    return len(values)
+
+
+def _expand(counts):
+    if isinstance(counts, dict):
+        return {key: _expand(value) for key, value in counts.items()}
+    return range(counts)
+
+
+def _activity_signatures(ocdfg):
+    """
+    For each activity, counts its events by the set of object types they are related to, so that the number of
+    events of an activity can be obtained for any selection of object types.
+    """
+    event_types = {}
+    for ot, activities in ocdfg["activities_ot"]["events"].items():
+        for act, events in activities.items():
+            act_events = event_types.setdefault(act, {})
+            for ev in events:
+                act_events.setdefault(ev, []).append(ot)
+
+    return {act: dict(Counter(tuple(sorted(types)) for types in events.values()))
+            for act, events in event_types.items()}
+
+
+def mine_ocdfg(ocel):
+    """
+    pm4py's OCDFG discovery, leaving out its computation of the edge durations couple by couple (see edge_durations).
+    """
+    return ocdfg_discovery.apply(ocel, parameters={"compute_edges_performance": False})
+
+
+def _split_by_edge(types, sources, targets, durations, type_names, activity_names):
+    """
+    Groups durations by (object type, source activity, target activity), each group sorted, with a single sort.
+    """
+    if len(durations) == 0:
+        return {}
+
+    n = len(activity_names)
+    keys = (types.astype(np.int64) * n + sources) * n + targets
+    order = np.lexsort((durations, keys))
+    keys, durations = keys[order], durations[order]
+    boundaries = np.flatnonzero(np.diff(keys)) + 1
+
+    edges = {}
+    for key, group in zip(keys[np.r_[0, boundaries]], np.split(durations, boundaries)):
+        ot, rest = divmod(int(key), n * n)
+        edges.setdefault(type_names[ot], {})[(activity_names[rest // n], activity_names[rest % n])] = group
+    return edges
+
+
+def edge_durations(ocel):
+    """
+    Durations in seconds of the directly-follows edges of every object type, as sorted NumPy arrays per metric: one
+    per event couple (event_couples) and one per event couple and object (total_objects). Computed in one pass over
+    the relations sorted by object and by position of their event in the event table, pairing every relation with the
+    previous one of its object. As in pm4py, events of an object with the same timestamp follow the event table.
+    """
+    events = ocel.events
+    relations = ocel.relations
+    if relations.empty:
+        return {metric: {} for metric in PERFORMANCE_METRICS}
+
+    object_types = ocel.objects.drop_duplicates(ocel.object_id_column).set_index(ocel.object_id_column)[
+        ocel.object_type_column]
+    positions = pd.Index(events[ocel.event_id_column]).get_indexer(relations[ocel.event_id_column])
+    objects = pd.factorize(relations[ocel.object_id_column])[0]
+    types, type_names = pd.factorize(relations[ocel.object_id_column].map(object_types))
+    valid = np.flatnonzero((positions >= 0) & (objects >= 0))
+    order = valid[np.lexsort((positions[valid], objects[valid]))]
+    positions, objects, types = positions[order], objects[order], types[order]
+
+    previous = np.flatnonzero((objects[1:] == objects[:-1]) & (types[1:] >= 0))
+    current = previous + 1
+    sources, targets, types = positions[previous], positions[current], types[current]
+
+    activities, activity_names = pd.factorize(events[ocel.event_activity])
+    timestamps = nanoseconds(events[ocel.event_timestamp])
+    durations = (timestamps[targets] - timestamps[sources]) / 1e9
+
+    # An event couple shared by several objects of the same type has a single duration.
+    couples = ~pd.DataFrame({"type": types, "source": sources, "target": targets}).duplicated().to_numpy()
+
+    activity_names, type_names = list(activity_names), list(type_names)
+    sources, targets = activities[sources], activities[targets]
+    return {
+        "event_couples": _split_by_edge(types[couples], sources[couples], targets[couples], durations[couples],
+                                        type_names, activity_names),
+        "total_objects": _split_by_edge(types, sources, targets, durations, type_names, activity_names),
+    }
+
+
+def aggregate_durations(durations, measure):
+    """
+    Performance measure of the sorted durations of an edge.
+    """
+    if measure == "mean":
+        return float(durations.mean())
+    if measure == "median":
+        return float(np.median(durations))
+    if measure == "p95":
+        return float(np.percentile(durations, 95))
+    if measure == "max":
+        return float(durations[-1])
+    raise ValueError("Invalid performance measure")
+
+
+def duration_summary(durations):
+    return {measure: aggregate_durations(durations, measure) for measure in PERFORMANCE_MEASURES}
+
+
+def compact_ocdfg(ocdfg, edges_performance=None):
+    """
+    Converts the OCDFG discovered by pm4py, which keeps sets of event and object identifiers for every metric, into
+    an OCDFG keeping only their sizes. Edge durations are kept as sorted NumPy arrays, taken from edges_performance
+    when they were computed apart.
+    """
+    compact = {
+        "activities": set(ocdfg["activities"]),
+        "object_types": set(ocdfg["object_types"]),
+    }
+
+    for key in COUNT_KEYS:
+        compact[key] = _count(ocdfg[key])
+
+    if edges_performance is not None:
+        compact["edges_performance"] = edges_performance
+    else:
+        compact["edges_performance"] = {}
+        for metric, per_type in ocdfg["edges_performance"].items():
+            compact["edges_performance"][metric] = {
+                ot: {edge: np.sort(np.asarray(durations, dtype=float)) for edge, durations in edges.items()}
+                for ot, edges in per_type.items()
+            }
+
+    compact["activity_signatures"] = _activity_signatures(ocdfg)
+    compact["frequency_index"] = frequency_index(compact)
+
+    return compact
+
+
+def is_compact(ocdfg):
+    return "activity_signatures" in ocdfg
+
+
+def frequency_index(ocdfg):
+    """
+    Sorts, for every metric, the frequencies of the activities and of the edges of all object types of a compact
+    OCDFG into ascending NumPy arrays.
+    """
+    return {
+        "activities": {
+            metric: np.sort(np.fromiter(ocdfg["activities_indep"][metric].values(), dtype=np.int64))
+            for metric in ACTIVITY_METRICS
+        },
+        "edges": {
+            metric: np.sort(np.fromiter((count for edges in ocdfg["edges"][metric].values() for count in edges.values()),
+                                        dtype=np.int64))
+            for metric in EDGE_METRICS
+        },
+    }
+
+
+def get_frequency_index(ocdfg):
+    if "frequency_index" not in ocdfg:
+        ocdfg["frequency_index"] = frequency_index(ocdfg)
+    return ocdfg["frequency_index"]
+
+
+def to_render_model(ocdfg, performance_measure="mean"):
+    """
+    Expands a compact OCDFG into the structure expected by pm4py's OCDFG visualizer, which only takes the len() of
+    the collections of identifiers: every count is expanded into a range of the same length. The durations of every
+    edge are reduced to the given performance measure, which any aggregation of the visualizer then leaves as is.
+    """
+    model = {
+        "activities": ocdfg["activities"],
+        "object_types": ocdfg["object_types"],
+    }
+
+    for key in COUNT_KEYS:
+        model[key] = _expand(ocdfg[key])
+
+    model["edges_performance"] = {}
+    for metric, per_type in ocdfg["edges_performance"].items():
+        model["edges_performance"][metric] = {
+            ot: {edge: [aggregate_durations(durations, performance_measure)] for edge, durations in edges.items()}
+            for ot, edges in per_type.items()
+        }
+
+    return model
+
+
+def compose_ocdfg(ocdfg, object_types):
+    """
+    Builds the OCDFG of the log restricted to the given object types out of the compact OCDFG of the whole log.
+
+    Every structure of the model except activities_indep is keyed by object type, so the per-type sub-models are
+    selected as they are. Objects have a single type, so the type-independent object counts are sums of the per-type
+    counts; the event counts are taken from the activity signatures.
+    """
+    object_types = set(object_types)
+
+    composed = {
+        "object_types": set(ocdfg["object_types"]) & object_types,
+        "activity_signatures": ocdfg["activity_signatures"],
+    }
+
+    for key in OBJECT_TYPE_KEYS:
+        composed[key] = {}
+        for metric, per_type in ocdfg[key].items():
+            composed[key][metric] = {ot: values for ot, values in per_type.items() if ot in object_types}
+
+    events = {}
+    for act, signatures in ocdfg["activity_signatures"].items():
+        count = sum(c for signature, c in signatures.items() if object_types.intersection(signature))
+        if count:
+            events[act] = count
+
+    composed["activities_indep"] = {"events": {}, "unique_objects": {}, "total_objects": {}}
+    for act in ocdfg["activities_indep"]["events"]:
+        if act not in events:
+            continue
+        composed["activities_indep"]["events"][act] = events[act]
+        for metric in ("unique_objects", "total_objects"):
+            composed["activities_indep"][metric][act] = sum(
+                activities.get(act, 0) for activities in composed["activities_ot"][metric].values())
+
+    composed["activities"] = set(composed["activities_indep"]["events"])
+    composed["frequency_index"] = frequency_index(composed)
+    if "approximation" in ocdfg:
+        composed["approximation"] = ocdfg["approximation"]
+
+    return composed
+
+
+def _spline_points(pos):
+    points = []
+    for token in pos.split():
+        if token.startswith(("e,", "s,")):
+            continue
+        x, y = token.split(",")[:2]
+        points.append([float(x), float(y)])
+    return points
+
+
+def apply_layout(graph, nodes, edges):
+    """
+    Lays out the Graphviz graph and sets the position and size of its nodes and the spline points of its edges, given
+    in the order they were added to the graph. Returns the width and height of the drawing.
+    """
+    layout = json.loads(graph.pipe(format="json"))
+    positions = {obj["name"]: obj for obj in layout.get("objects", [])}
+    for node in nodes:
+        obj = positions[node["id"]]
+        x, y = obj["pos"].split(",")
+        node.update(x=float(x), y=float(y), width=float(obj["width"]) * 72, height=float(obj["height"]) * 72)
+    for edge, obj in zip(edges, sorted(layout.get("edges", []), key=lambda e: e["_gvid"])):
+        edge["points"] = _spline_points(obj["pos"])
+
+    bb = [float(x) for x in layout["bb"].split(",")]
+    return bb[2], bb[3]
+
+
+def to_graph_json(ocdfg, rankdir="LR"):
+    """
+    Describes a compact OCDFG as nodes and edges carrying every frequency metric, laid out by Graphviz, so that a
+    client can apply the activity and path thresholds itself. Nodes are the activities plus a start and an end node
+    per object type; coordinates are in points with the origin at the bottom left corner.
+    """
+    graph = Digraph("ocdfg", graph_attr={"rankdir": rankdir}, node_attr={"shape": "box"})
+    nodes = []
+    edges = []
+    node_ids = {}
+    approximation = ocdfg.get("approximation")
+
+    for act in sorted(ocdfg["activities_indep"]["events"]):
+        node_id = f"a{len(nodes)}"
+        node_ids[act] = node_id
+        nodes.append({
+            "id": node_id,
+            "kind": "activity",
+            "label": act,
+            "counts": {metric: ocdfg["activities_indep"][metric][act] for metric in ("events", "unique_objects",
+                                                                                     "total_objects")},
+            "counts_per_object_type": {
+                ot: {metric: ocdfg["activities_ot"][metric][ot][act]
+                     for metric in ("events", "unique_objects", "total_objects")}
+                for ot in ocdfg["activities_ot"]["events"] if act in ocdfg["activities_ot"]["events"][ot]
+            },
+        })
+        if approximation:
+            nodes[-1]["error_bounds"] = {
+                metric: error_bound(count, approximation["event_fraction" if metric == "events" else "fraction"])
+                for metric, count in nodes[-1]["counts"].items()
+            }
+        graph.node(node_id, label=act)
+
+    def add_edge(ot, source, target, counts):
+        edge = {"id": f"e{len(edges)}", "object_type": ot, "source": source, "target": target, "counts": counts}
+        if approximation:
+            fraction = approximation["object_type_fractions"][ot]
+            edge["error_bounds"] = {metric: error_bound(count, fraction) for metric, count in counts.items()}
+        edges.append(edge)
+        graph.edge(source, target, label=f"{ot} {max(counts.values())}")
+
+    for ot in sorted(ocdfg["object_types"]):
+        color = ot_to_color(ot)
+        for kind, key in (("start", "start_activities"), ("end", "end_activities")):
+            if not ocdfg[key]["events"].get(ot):
+                continue
+            node_id = f"{kind[0]}{len(nodes)}"
+            nodes.append({"id": node_id, "kind": kind, "label": ot, "object_type": ot, "color": color})
+            graph.node(node_id, label=ot, shape="ellipse" if kind == "start" else "underline")
+            for act in ocdfg[key]["events"][ot]:
+                counts = {metric: ocdfg[key][metric][ot][act] for metric in ("events", "unique_objects",
+                                                                             "total_objects")}
+                if kind == "start":
+                    add_edge(ot, node_id, node_ids[act], counts)
+                else:
+                    add_edge(ot, node_ids[act], node_id, counts)
+
+        for (act1, act2), count in ocdfg["edges"]["event_couples"].get(ot, {}).items():
+            add_edge(ot, node_ids[act1], node_ids[act2], {
+                "event_couples": count,
+                "unique_objects": ocdfg["edges"]["unique_objects"][ot][(act1, act2)],
+                "total_objects": ocdfg["edges"]["total_objects"][ot][(act1, act2)],
+            })
+            edges[-1]["durations"] = {
+                metric: duration_summary(ocdfg["edges_performance"][metric][ot][(act1, act2)])
+                for metric in PERFORMANCE_METRICS
+                if len(ocdfg["edges_performance"].get(metric, {}).get(ot, {}).get((act1, act2), ())) > 0
+            }
+
+    width, height = apply_layout(graph, nodes, edges)
+    return {
+        "object_types": sorted(ocdfg["object_types"]),
+        "colors": {ot: ot_to_color(ot) for ot in sorted(ocdfg["object_types"])},
+        "width": width,
+        "height": height,
+        "nodes": nodes,
+        "edges": edges,
+        "edges_per_object_type": {ot: [edge["id"] for edge in edges if edge["object_type"] == ot]
+                                  for ot in sorted(ocdfg["object_types"])},
+        "approximation": approximation,
+    }
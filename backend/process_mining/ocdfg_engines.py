@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .ocdfg import ACTIVITY_METRICS, EDGE_METRICS, PERFORMANCE_METRICS, compact_ocdfg, edge_durations, \
+    frequency_index, mine_ocdfg, _split_by_edge
+from .timeindex import nanoseconds
+
+
+def discover_pm4py(ocel):
+    """
+    Compact OCDFG of pm4py's discovery, which keeps the identifiers of every metric in Python sets.
+    """
+    return compact_ocdfg(mine_ocdfg(ocel), edge_durations(ocel))
+
+
+def _nested(keys, counts, names):
+    """
+    Nested dicts of the counts of the integer-coded keys: one level per column of keys, except that two trailing
+    activity columns form a single (source, target) level.
+    """
+    nested = {}
+    for row, count in zip(keys.tolist(), counts.tolist()):
+        labels = [column_names[code] for column_names, code in zip(names, row)]
+        if len(labels) == 3:
+            labels = [labels[0], (labels[1], labels[2])]
+        level = nested
+        for label in labels[:-1]:
+            level = level.setdefault(label, {})
+        level[labels[-1]] = count
+    return nested
+
+
+def _group_counts(frame, by, distinct):
+    """
+    Per group of the by columns: the number of distinct values of each of the distinct columns, and the number of
+    rows. Returns the group keys and the counts in the order of the columns.
+    """
+    groups = frame.groupby(by, sort=False)
+    counts = pd.concat([groups[column].nunique() for column in distinct] + [groups.size()], axis=1)
+    return counts.index.to_frame(index=False).to_numpy(), [counts[column].to_numpy() for column in counts.columns]
+
+
+def _decode_edges(unique, counts, type_names, activity_names):
+    n = len(activity_names)
+    ots, rest = np.divmod(unique, n * n)
+    return _nested(np.column_stack([ots, rest // n, rest % n]), counts, [type_names, activity_names, activity_names])
+
+
+def _activity_signatures(relations, type_names, activity_names):
+    """
+    Number of events of each activity per set of related object types, as in ocdfg._activity_signatures.
+    """
+    typed = relations[relations["type"] >= 0].drop_duplicates(["event", "activity", "type"])
+    if typed.empty:
+        return {}
+
+    if len(type_names) < 64:
+        # The set of types of an event as a bit mask, types being coded in sorted order.
+        typed = typed.assign(mask=np.left_shift(np.uint64(1), typed["type"].to_numpy().astype(np.uint64)))
+        sets = typed.groupby(["event", "activity"], sort=False)["mask"].sum()
+        counts = sets.groupby([sets.index.get_level_values("activity"), sets.to_numpy()]).size()
+        decode = {mask: tuple(name for code, name in enumerate(type_names) if int(mask) >> code & 1)
+                  for mask in counts.index.get_level_values(1).unique()}
+    else:
+        sets = typed.sort_values("type").groupby(["event", "activity"], sort=False)["type"].agg(tuple)
+        counts = sets.groupby([sets.index.get_level_values("activity"), sets.to_numpy()]).size()
+        decode = {codes: tuple(type_names[code] for code in codes)
+                  for codes in counts.index.get_level_values(1).unique()}
+
+    signatures = {}
+    for (act, types), count in counts.items():
+        signatures.setdefault(activity_names[act], {})[decode[types]] = int(count)
+    return signatures
+
+
+def discover_pandas(ocel):
+    """
+    Compact OCDFG computed on integer-coded columns of the relations with vectorized group operations, identical to
+    the one of discover_pm4py. Like pm4py, the directly-follows edges of an object follow the order of the event table
+    and its start and end activities the order of the relation table.
+    """
+    events = ocel.events
+    relations = ocel.relations
+    activity_names = list(pd.unique(pd.concat([events[ocel.event_activity], relations[ocel.event_activity]])))
+    activity_index = pd.Index(activity_names)
+    type_codes, type_names = pd.factorize(pd.concat([relations[ocel.object_type_column],
+                                                     ocel.objects[ocel.object_type_column]]), sort=True)
+    type_names = list(type_names)
+
+    frame = pd.DataFrame({
+        "event": pd.factorize(relations[ocel.event_id_column])[0],
+        "object": pd.factorize(relations[ocel.object_id_column])[0],
+        "activity": activity_index.get_indexer(relations[ocel.event_activity]),
+        "type": type_codes[:len(relations)],
+    })
+    frame = frame[(frame["event"] >= 0) & (frame["object"] >= 0) & (frame["activity"] >= 0)]
+
+    compact = {
+        "activities": set(events[ocel.event_activity].unique()),
+        "object_types": set(ocel.objects[ocel.object_type_column].unique()),
+    }
+
+    keys, counts = _group_counts(frame, ["activity"], ["event", "object"])
+    compact["activities_indep"] = {metric: _nested(keys, metric_counts, [activity_names])
+                                   for metric, metric_counts in zip(ACTIVITY_METRICS, counts)}
+
+    typed = frame[frame["type"] >= 0]
+    keys, counts = _group_counts(typed, ["type", "activity"], ["event", "object"])
+    compact["activities_ot"] = {metric: _nested(keys, metric_counts, [type_names, activity_names])
+                                for metric, metric_counts in zip(ACTIVITY_METRICS, counts)}
+
+    for key, keep in (("start_activities", "first"), ("end_activities", "last")):
+        bounds = typed[~typed.duplicated(["type", "object"], keep=keep)]
+        keys, counts = _group_counts(bounds, ["type", "activity"], ["event", "object"])
+        compact[key] = {metric: _nested(keys, metric_counts, [type_names, activity_names])
+                        for metric, metric_counts in zip(ACTIVITY_METRICS, counts)}
+
+    compact["edges"], compact["edges_performance"] = _edges(ocel, relations, type_names, activity_index)
+    compact["activity_signatures"] = _activity_signatures(frame, type_names, activity_names)
+    compact["frequency_index"] = frequency_index(compact)
+    return compact
+
+
+def _edges(ocel, relations, type_names, activity_index):
+    """
+    Directly-follows counts and durations of every object type. The relations are ordered by the position of their
+    event in the event table and their object, every relation then following the previous one of its object.
+    """
+    events = ocel.events
+    activity_names = list(activity_index)
+    object_types = ocel.objects.drop_duplicates(ocel.object_id_column).set_index(ocel.object_id_column)[
+        ocel.object_type_column]
+
+    positions = pd.Index(events[ocel.event_id_column]).get_indexer(relations[ocel.event_id_column])
+    objects = pd.factorize(relations[ocel.object_id_column])[0]
+    types = pd.Index(type_names).get_indexer(relations[ocel.object_id_column].map(object_types))
+    valid = np.flatnonzero((positions >= 0) & (objects >= 0))
+    order = valid[np.lexsort((positions[valid], objects[valid]))]
+    positions, objects, types = positions[order], objects[order], types[order]
+
+    previous = np.flatnonzero((objects[1:] == objects[:-1]) & (types[1:] >= 0))
+    current = previous + 1
+    sources, targets = positions[previous], positions[current]
+    types, objects = types[current], objects[current]
+
+    event_activities = activity_index.get_indexer(events[ocel.event_activity])
+    n = len(activity_names)
+    keys = (types.astype(np.int64) * n + event_activities[sources]) * n + event_activities[targets]
+    timestamps = nanoseconds(events[ocel.event_timestamp])
+    durations = (timestamps[targets] - timestamps[sources]) / 1e9
+
+    couples = ~pd.DataFrame({"type": types, "source": sources, "target": targets}).duplicated().to_numpy()
+    occurrences = ~pd.DataFrame({"source": sources, "target": targets, "object": objects}).duplicated().to_numpy()
+    distinct = {
+        "event_couples": couples,
+        "unique_objects": ~pd.DataFrame({"key": keys, "object": objects}).duplicated().to_numpy(),
+        "total_objects": occurrences,
+    }
+
+    edges = {}
+    for metric in EDGE_METRICS:
+        unique, counts = np.unique(keys[distinct[metric]], return_counts=True)
+        edges[metric] = _decode_edges(unique, counts, type_names, activity_names)
+
+    edges_performance = {}
+    for metric in PERFORMANCE_METRICS:
+        mask = distinct[metric]
+        edge_types, rest = np.divmod(keys[mask], n * n)
+        edges_performance[metric] = _split_by_edge(edge_types, rest // n, rest % n, durations[mask], type_names,
+                                                   activity_names)
+    return edges, edges_performance
+
+
+OCDFG_ENGINES = {
+    "pm4py": discover_pm4py,
+    "pandas": discover_pandas,
+}
+
+
+def get_ocdfg_engine(name=None):
+    """
+    The OCDFG discovery of the given name, by default the one configured by OCDFG_ENGINE.
+    """
+    name = name or settings.OCDFG_ENGINE
+    if name not in OCDFG_ENGINES:
+        raise ValueError(f"Unknown OCDFG engine '{name}', available: {', '.join(OCDFG_ENGINES)}")
+    return OCDFG_ENGINES[name]
@@ -0,0 +1,395 @@
+import os
+import sqlite3
+from contextlib import closing
+from xml.etree import ElementTree
+
+import ijson
+import pandas as pd
+from pm4py.objects.log.util import dataframe_utils
+from pm4py.objects.ocel import constants
+from pm4py.objects.ocel.obj import OCEL
+from pm4py.objects.ocel.util import filtering_utils, ocel_consistency
+from pm4py.util import dt_parsing, constants as pm4_constants
+
+BATCH_SIZE = 50000
+
+OCEL1_GLOBALS = (constants.OCEL_GLOBAL_LOG, constants.OCEL_GLOBAL_EVENT, constants.OCEL_GLOBAL_OBJECT)
+OCEL1_SECTIONS = (constants.OCEL_EVENTS_KEY, constants.OCEL_OBJECTS_KEY, constants.OCEL_OBJCHANGES_KEY)
+OCEL2_SECTIONS = ("events", "objects")
+
+EVENT_ID = constants.DEFAULT_EVENT_ID
+EVENT_ACTIVITY = constants.DEFAULT_EVENT_ACTIVITY
+EVENT_TIMESTAMP = constants.DEFAULT_EVENT_TIMESTAMP
+OBJECT_ID = constants.DEFAULT_OBJECT_ID
+OBJECT_TYPE = constants.DEFAULT_OBJECT_TYPE
+QUALIFIER = constants.DEFAULT_QUALIFIER
+
+
+class _TableBuilder:
+    """
+    Accumulates rows in fixed-size batches, each converted to a dataframe as soon as it is full.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.rows = []
+        self.frames = []
+
+    def append(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.frames.append(pd.DataFrame(self.rows))
+            self.rows = []
+
+    def build(self):
+        self.flush()
+        if not self.frames:
+            return pd.DataFrame(columns=self.columns)
+        frames, self.frames = self.frames, []
+        return pd.concat(frames, ignore_index=True)
+
+
+def _iter_section_items(f, sections, whole_sections=()):
+    """
+    Parses the JSON document in a single pass, yielding (section, key, item) for every member of the given top-level
+    sections (maps or arrays) and (section, None, value) for the given top-level values. Only one item at a time is
+    materialized as Python objects.
+    """
+    level = 0
+    section = None
+    key = None
+    builder = None
+    item_depth = 0
+
+    for _, event, value in ijson.parse(f, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if event in ("start_map", "start_array"):
+                item_depth += 1
+            elif event in ("end_map", "end_array"):
+                item_depth -= 1
+            if item_depth == 0:
+                yield section, key, builder.value
+                builder = None
+            continue
+
+        if event in ("start_map", "start_array"):
+            if (level == 2 and section in sections) or (level == 1 and section in whole_sections):
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+                item_depth = 1
+                if level == 1:
+                    key = None
+                continue
+            level += 1
+        elif event in ("end_map", "end_array"):
+            level -= 1
+        elif event == "map_key":
+            if level == 1:
+                section = value
+            elif level == 2:
+                key = value
+        elif level == 2 and section in sections:
+            yield section, key, value
+
+
+def detect_ocel_layout(f):
+    """
+    Tells apart the OCEL 1.0 and OCEL 2.0 JSON layouts from the first top-level key of the document.
+    """
+    for prefix, event, value in ijson.parse(f):
+        if prefix == "" and event == "map_key":
+            return "ocel1" if value.startswith("ocel:") else "ocel2"
+    raise ValueError("Empty JSON-OCEL document")
+
+
+def _assemble_ocel(events, objects, relations, o2o, object_changes, globals):
+    """
+    Builds the OCEL from its tables, the relations carrying the type of their object: relations to unknown objects are
+    dropped, and the events and the relations are sorted by timestamp.
+    """
+    relations = relations.dropna(subset=[OBJECT_TYPE]).reset_index(drop=True)
+    relation_columns = [EVENT_ID, EVENT_ACTIVITY, EVENT_TIMESTAMP, OBJECT_ID, OBJECT_TYPE]
+    if QUALIFIER in relations.columns:
+        relation_columns.append(QUALIFIER)
+    relations = relations[relation_columns]
+
+    events = events.sort_values(EVENT_TIMESTAMP, kind="stable")
+    relations = relations.sort_values(EVENT_TIMESTAMP, kind="stable")
+
+    ocel = OCEL(events=events, objects=objects, relations=relations, o2o=o2o, object_changes=object_changes,
+                globals=globals)
+    ocel = ocel_consistency.apply(ocel)
+    return filtering_utils.propagate_relations_filtering(ocel)
+
+
+def _build_ocel(events, objects, relations, o2o, object_changes, types, globals):
+    relations = relations.build()
+    relations[OBJECT_TYPE] = relations[OBJECT_ID].map(types)
+
+    o2o = o2o.build() if o2o.frames or o2o.rows else None
+    object_changes = object_changes.build() if object_changes.frames or object_changes.rows else None
+    if object_changes is not None and len(object_changes) > 0:
+        object_changes = dataframe_utils.convert_timestamp_columns_in_df(
+            object_changes, timest_format=pm4_constants.DEFAULT_XES_TIMESTAMP_PARSE_FORMAT,
+            timest_columns=[EVENT_TIMESTAMP])
+        object_changes[OBJECT_TYPE] = object_changes[OBJECT_ID].map(types)
+
+    return _assemble_ocel(events.build(), objects.build(), relations, o2o, object_changes, globals)
+
+
+def _empty_globals():
+    return {constants.OCEL_GLOBAL_LOG: {}, constants.OCEL_GLOBAL_EVENT: {}, constants.OCEL_GLOBAL_OBJECT: {}}
+
+
+def _new_tables():
+    return (_TableBuilder([EVENT_ID, EVENT_TIMESTAMP, EVENT_ACTIVITY]),
+            _TableBuilder([OBJECT_ID, OBJECT_TYPE]),
+            _TableBuilder([EVENT_ID, EVENT_ACTIVITY, EVENT_TIMESTAMP, OBJECT_ID]),
+            _TableBuilder([OBJECT_ID, OBJECT_ID + "_2", QUALIFIER]),
+            _TableBuilder([OBJECT_ID, OBJECT_TYPE, EVENT_TIMESTAMP]))
+
+
+def _append_event(events, relations, ev_id, activity, timestamp, vmap, qualifiers):
+    row = {EVENT_ID: ev_id, EVENT_TIMESTAMP: timestamp, EVENT_ACTIVITY: activity}
+    row.update(vmap)
+    events.append(row)
+    for obj, qualifier in qualifiers.items():
+        relation = {EVENT_ID: ev_id, EVENT_ACTIVITY: activity, EVENT_TIMESTAMP: timestamp, OBJECT_ID: obj}
+        if qualifier is not None:
+            relation[QUALIFIER] = qualifier
+        relations.append(relation)
+
+
+def _read_ocel1(f):
+    parser = dt_parsing.parser.get()
+    events, objects, relations, o2o, object_changes = _new_tables()
+    types = {}
+    globals = {}
+
+    for section, key, item in _iter_section_items(f, OCEL1_SECTIONS, OCEL1_GLOBALS):
+        if section == constants.OCEL_EVENTS_KEY:
+            qualifiers = dict.fromkeys(item[constants.OCEL_OMAP_KEY])
+            for element in item.get(constants.OCEL_TYPED_OMAP_KEY, []):
+                if OBJECT_ID in element and element[OBJECT_ID] in qualifiers:
+                    qualifiers[element[OBJECT_ID]] = element[QUALIFIER]
+            _append_event(events, relations, key, item[EVENT_ACTIVITY], parser.apply(item[EVENT_TIMESTAMP]),
+                          item[constants.OCEL_VMAP_KEY], qualifiers)
+        elif section == constants.OCEL_OBJECTS_KEY:
+            types[key] = item[OBJECT_TYPE]
+            row = {OBJECT_ID: key, OBJECT_TYPE: item[OBJECT_TYPE]}
+            row.update(item[constants.OCEL_OVMAP_KEY])
+            objects.append(row)
+            for target in item.get(constants.OCEL_O2O_KEY, []):
+                o2o.append({OBJECT_ID: key, OBJECT_ID + "_2": target[OBJECT_ID], QUALIFIER: target[QUALIFIER]})
+        elif section == constants.OCEL_OBJCHANGES_KEY:
+            object_changes.append(item)
+        else:
+            globals[section] = item
+
+    return _build_ocel(events, objects, relations, o2o, object_changes, types, globals)
+
+
+def _read_ocel2(f):
+    parser = dt_parsing.parser.get()
+    events, objects, relations, o2o, object_changes = _new_tables()
+    types = {}
+
+    for section, _, item in _iter_section_items(f, OCEL2_SECTIONS):
+        if section == "events":
+            vmap = {x["name"]: x["value"] for x in item.get("attributes") or []}
+            qualifiers = {}
+            for x in item.get("relationships") or []:
+                qualifiers[x["objectId"]] = x["qualifier"]
+            _append_event(events, relations, item["id"], item["type"], parser.apply(item["time"]), vmap,
+                          qualifiers)
+        else:
+            types[item["id"]] = item["type"]
+            ovmap = {}
+            for x in item.get("attributes") or []:
+                if x["name"] in ovmap:
+                    object_changes.append({OBJECT_ID: item["id"], OBJECT_TYPE: item["type"], "ocel:field": x["name"],
+                                           x["name"]: x["value"], EVENT_TIMESTAMP: x["time"]})
+                else:
+                    ovmap[x["name"]] = x["value"]
+            row = {OBJECT_ID: item["id"], OBJECT_TYPE: item["type"]}
+            row.update(ovmap)
+            objects.append(row)
+            for x in item.get("relationships") or []:
+                o2o.append({OBJECT_ID: item["id"], OBJECT_ID + "_2": x["objectId"], QUALIFIER: x["qualifier"]})
+
+    return _build_ocel(events, objects, relations, o2o, object_changes, types, _empty_globals())
+
+
+def read_json_ocel(source):
+    """
+    Reads an OCEL 1.0 or OCEL 2.0 JSON file, given by path or as a seekable binary file object, in a single streaming
+    pass, building the events, objects and relations tables in batches of BATCH_SIZE rows instead of loading the whole
+    document in memory.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return read_json_ocel(f)
+
+    layout = detect_ocel_layout(source)
+    source.seek(0)
+    if layout == "ocel1":
+        return _read_ocel1(source)
+    return _read_ocel2(source)
+
+
+def _xml_values(element):
+    """
+    Children of an OCEL 1.0 XML element by key, as their value or, for lists, as the values of their children.
+    """
+    return {child.get("key"): [x.get("value") for x in child] if child.tag == "list" else child.get("value")
+            for child in element}
+
+
+def _read_xml_ocel1(f):
+    parser = dt_parsing.parser.get()
+    events, objects, relations, o2o, object_changes = _new_tables()
+    types = {}
+
+    for _, element in ElementTree.iterparse(f):
+        if element.tag == "event":
+            values = _xml_values(element)
+            _append_event(events, relations, values["id"], values["activity"], parser.apply(values["timestamp"]), {},
+                          dict.fromkeys(values.get("omap") or []))
+            element.clear()
+        elif element.tag == "object":
+            values = _xml_values(element)
+            types[values["id"]] = values["type"]
+            objects.append({OBJECT_ID: values["id"], OBJECT_TYPE: values["type"]})
+            element.clear()
+
+    return _build_ocel(events, objects, relations, o2o, object_changes, types, _empty_globals())
+
+
+def _read_xml_ocel2(f):
+    parser = dt_parsing.parser.get()
+    events, objects, relations, o2o, object_changes = _new_tables()
+    types = {}
+
+    for _, element in ElementTree.iterparse(f):
+        if element.tag == "event":
+            qualifiers = {x.get("object-id"): x.get("qualifier") for x in element.iterfind("objects/relationship")}
+            _append_event(events, relations, element.get("id"), element.get("type"),
+                          parser.apply(element.get("time")), {}, qualifiers)
+            element.clear()
+        elif element.tag == "object":
+            types[element.get("id")] = element.get("type")
+            objects.append({OBJECT_ID: element.get("id"), OBJECT_TYPE: element.get("type")})
+            for x in element.iterfind("objects/relationship"):
+                o2o.append({OBJECT_ID: element.get("id"), OBJECT_ID + "_2": x.get("object-id"),
+                            QUALIFIER: x.get("qualifier")})
+            element.clear()
+
+    return _build_ocel(events, objects, relations, o2o, object_changes, types, _empty_globals())
+
+
+def detect_xml_layout(f):
+    """
+    Tells apart the OCEL 1.0 and OCEL 2.0 XML layouts from the first element under the root: OCEL 1.0 documents start
+    with their global attributes.
+    """
+    elements = ElementTree.iterparse(f, events=("start",))
+    next(elements, None)
+    for _, element in elements:
+        return "ocel1" if element.tag == "global" else "ocel2"
+    raise ValueError("Empty XML-OCEL document")
+
+
+def read_xml_ocel(source):
+    """
+    Reads an OCEL 1.0 or OCEL 2.0 XML file, given by path or as a seekable binary file object, in a single streaming
+    pass. Only the identifiers, types, timestamps and relationships are read, not the attributes of the events and
+    objects, which the mining pipeline does not use.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return read_xml_ocel(f)
+
+    layout = detect_xml_layout(source)
+    source.seek(0)
+    if layout == "ocel1":
+        return _read_xml_ocel1(source)
+    return _read_xml_ocel2(source)
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def read_sqlite_ocel(path):
+    """
+    Reads an OCEL 2.0 SQLite database with one bulk query per table, projected on the identifier, type, time and
+    relationship columns: the attribute columns of the per-type event and object tables are never read.
+    """
+    with closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as connection:
+        tables = {name for name, in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if not {"event", "object", "event_object", "event_map_type"} <= tables:
+            raise ValueError("Not an OCEL 2.0 SQLite database")
+
+        time_tables = [f"event_{type_map}" for type_map, in connection.execute(
+            "SELECT ocel_type_map FROM event_map_type")]
+        time_tables = [table for table in time_tables if table in tables]
+
+        events = pd.read_sql_query(f"SELECT ocel_id AS {_quote(EVENT_ID)}, ocel_type AS {_quote(EVENT_ACTIVITY)} "
+                                   f"FROM event", connection)
+        if time_tables:
+            times = pd.read_sql_query(" UNION ALL ".join(
+                f"SELECT ocel_id AS {_quote(EVENT_ID)}, ocel_time AS {_quote(EVENT_TIMESTAMP)} FROM {_quote(table)}"
+                for table in time_tables), connection)
+        else:
+            times = pd.DataFrame(columns=[EVENT_ID, EVENT_TIMESTAMP])
+        objects = pd.read_sql_query(f"SELECT ocel_id AS {_quote(OBJECT_ID)}, ocel_type AS {_quote(OBJECT_TYPE)} "
+                                    f"FROM object", connection)
+        relations = pd.read_sql_query(
+            f"SELECT ocel_event_id AS {_quote(EVENT_ID)}, ocel_object_id AS {_quote(OBJECT_ID)}, "
+            f"ocel_qualifier AS {_quote(QUALIFIER)} FROM event_object", connection)
+        o2o = None
+        if "object_object" in tables:
+            o2o = pd.read_sql_query(
+                f"SELECT ocel_source_id AS {_quote(OBJECT_ID)}, ocel_target_id AS {_quote(OBJECT_ID + '_2')}, "
+                f"ocel_qualifier AS {_quote(QUALIFIER)} FROM object_object", connection)
+
+    times[EVENT_TIMESTAMP] = pd.to_datetime(times[EVENT_TIMESTAMP], utc=True, format="ISO8601")
+    events = events.merge(times.drop_duplicates(EVENT_ID), on=EVENT_ID)[[EVENT_ID, EVENT_TIMESTAMP, EVENT_ACTIVITY]]
+    relations = relations.merge(events, on=EVENT_ID)
+    relations[OBJECT_TYPE] = relations[OBJECT_ID].map(
+        objects.drop_duplicates(OBJECT_ID).set_index(OBJECT_ID)[OBJECT_TYPE])
+
+    return _assemble_ocel(events, objects, relations, o2o, None, _empty_globals())
+
+
+READERS = {
+    ".jsonocel": read_json_ocel,
+    ".xmlocel": read_xml_ocel,
+    ".sqlite": read_sqlite_ocel,
+}
+OCEL_EXTENSIONS = tuple(READERS)
+
+
+def ocel_extension(file_name):
+    """
+    Extension of a file name among the OCEL formats that can be read, or None.
+    """
+    for extension in OCEL_EXTENSIONS:
+        if file_name.lower().endswith(extension):
+            return extension
+    return None
+
+
+def read_ocel(source):
+    """
+    Reads an OCEL file in any of the supported formats, recognized from the extension of its path. File objects, such
+    as the stream of a chunked upload, are read as JSON.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return READERS.get(ocel_extension(os.fspath(source)), read_json_ocel)(source)
+    return read_json_ocel(source)
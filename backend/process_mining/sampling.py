@@ -0,0 +1,74 @@
+import math
+
+import numpy as np
+from pm4py.objects.ocel.obj import OCEL
+
+CONFIDENCE_Z = 1.96
+
+
+def sample_ocel(ocel, fraction, seed=0):
+    """
+    Samples the given fraction of the objects of every object type (at least one per type) and keeps all the relations
+    of the sampled objects, so that their directly-follows relations are the ones of the whole log. Returns the
+    sampled log and the fraction of objects actually sampled per object type.
+    """
+    rng = np.random.default_rng(seed)
+    objects = ocel.objects
+    sampled = []
+    fractions = {}
+    for ot, ids in objects.groupby(ocel.object_type_column)[ocel.object_id_column]:
+        size = max(1, round(fraction * len(ids)))
+        sampled.append(rng.choice(ids.to_numpy(), size=size, replace=False))
+        fractions[ot] = size / len(ids)
+    sampled = np.concatenate(sampled) if sampled else np.array([])
+
+    relations = ocel.relations[ocel.relations[ocel.object_id_column].isin(sampled)]
+    events = ocel.events[ocel.events[ocel.event_id_column].isin(relations[ocel.event_id_column].unique())]
+    objects = objects[objects[ocel.object_id_column].isin(sampled)]
+
+    return OCEL(events=events, objects=objects, relations=relations, globals=ocel.globals), fractions
+
+
+def _scale(value, factor):
+    if isinstance(value, dict):
+        return {key: _scale(count, factor) for key, count in value.items()}
+    return int(round(value / factor))
+
+
+def scale_ocdfg(ocdfg, fractions, fraction, event_fraction):
+    """
+    Scales the counts of a compact OCDFG discovered on an object sample back to the size of the whole log: the
+    structures of every object type by the fraction of its objects that was sampled, the event counts of the
+    activities by the fraction of the events that relate at least one sampled object.
+    """
+    for key in ("edges", "activities_ot", "start_activities", "end_activities"):
+        for metric, per_type in ocdfg[key].items():
+            ocdfg[key][metric] = {ot: _scale(values, fractions[ot]) for ot, values in per_type.items()}
+
+    ocdfg["activity_signatures"] = _scale(ocdfg["activity_signatures"], event_fraction)
+    ocdfg["activities_indep"]["events"] = _scale(ocdfg["activities_indep"]["events"], event_fraction)
+    for metric in ("unique_objects", "total_objects"):
+        ocdfg["activities_indep"][metric] = {
+            act: sum(activities.get(act, 0) for activities in ocdfg["activities_ot"][metric].values())
+            for act in ocdfg["activities_indep"][metric]
+        }
+
+    # The frequency index of the sample no longer matches the counts.
+    ocdfg.pop("frequency_index", None)
+    ocdfg["approximation"] = {
+        "fraction": fraction,
+        "event_fraction": event_fraction,
+        "object_type_fractions": fractions,
+        "confidence": 0.95,
+    }
+    return ocdfg
+
+
+def error_bound(count, fraction):
+    """
+    Half-width of the 95% confidence interval of a count estimated from a sample of the given fraction of the
+    objects, treating the sampled count as binomial.
+    """
+    if fraction >= 1:
+        return 0
+    return int(math.ceil(CONFIDENCE_Z * math.sqrt(count * (1 - fraction) / fraction)))
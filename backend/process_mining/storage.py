@@ -0,0 +1,172 @@
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from django.conf import settings
+from pyarrow import feather
+from pm4py.objects.ocel import constants
+from pm4py.objects.ocel.obj import OCEL
+
+from .compression import get_codec
+from .timeindex import build_time_index, write_time_index
+
+OCEL_TABLES = ("events", "objects", "relations", "o2o", "e2e", "object_changes")
+
+# Columns read by the mining pipeline (discovery, filtering); event and object attributes are left on disk.
+MINING_COLUMNS = {
+    "events": [constants.DEFAULT_EVENT_ID, constants.DEFAULT_EVENT_ACTIVITY, constants.DEFAULT_EVENT_TIMESTAMP],
+    "objects": [constants.DEFAULT_OBJECT_ID, constants.DEFAULT_OBJECT_TYPE],
+    "relations": [constants.DEFAULT_EVENT_ID, constants.DEFAULT_EVENT_ACTIVITY, constants.DEFAULT_EVENT_TIMESTAMP,
+                  constants.DEFAULT_OBJECT_ID, constants.DEFAULT_OBJECT_TYPE, constants.DEFAULT_QUALIFIER],
+}
+
+GLOBALS_FILE = "globals.json"
+# Schema metadata key of the compression a table is stored with.
+COMPRESSION_KEY = "compression"
+
+
+def new_artifact_path(suffix=""):
+    os.makedirs(settings.ARTIFACT_STORAGE_ROOT, exist_ok=True)
+    return os.path.join(settings.ARTIFACT_STORAGE_ROOT, f"{uuid.uuid4()}{suffix}")
+
+
+def _to_arrow(df):
+    columns = {}
+    for column in df.columns:
+        try:
+            columns[column] = pa.array(df[column], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            columns[column] = pa.array(df[column].astype("string"), from_pandas=True)
+    return pa.table(columns) if columns else pa.table({})
+
+
+def store_ocel(ocel, codec=None):
+    """
+    Stores the tables of the OCEL as Arrow IPC files in a new directory of the artifact storage, so that they can be
+    memory-mapped and read column by column, along with the time index of its events. The tables are uncompressed
+    unless the codec has an Arrow counterpart (zstd, lz4), and written as a single record batch so that their columns
+    can be read without concatenating chunks.
+    """
+    compression = get_codec(codec).arrow_compression
+    ocel_path = new_artifact_path()
+    os.makedirs(ocel_path)
+
+    for table in OCEL_TABLES:
+        df = getattr(ocel, table).reset_index(drop=True)
+        arrow_table = _to_arrow(df).replace_schema_metadata({COMPRESSION_KEY: compression})
+        feather.write_feather(arrow_table, os.path.join(ocel_path, f"{table}.arrow"), compression=compression,
+                              chunksize=max(len(df), 1))
+
+    with open(os.path.join(ocel_path, GLOBALS_FILE), "w") as f:
+        json.dump(ocel.globals, f, default=str)
+
+    write_time_index(ocel_path, build_time_index(ocel))
+    return ocel_path
+
+
+def _pandas_dtype(arrow_type):
+    # Timezone-aware timestamps are otherwise copied by the conversion, even when they could map the file.
+    if pa.types.is_timestamp(arrow_type) and arrow_type.tz is not None:
+        return pd.DatetimeTZDtype(arrow_type.unit, arrow_type.tz)
+    return None
+
+
+def read_table(ocel_path, table, columns=None, writable=True):
+    """
+    Reads the given columns of a table of a stored OCEL. Unless writable is set, its numeric and timestamp columns
+    without nulls are read-only views of the memory-mapped file. String columns are always copied into Python
+    objects, as are all the columns of compressed tables and of tables stored in several record batches.
+    """
+    path = os.path.join(ocel_path, f"{table}.arrow")
+    reader = pa.ipc.open_file(pa.memory_map(path))
+    if columns is not None:
+        columns = [column for column in columns if column in reader.schema.names]
+    compression = (reader.schema.metadata or {}).get(COMPRESSION_KEY.encode(), b"uncompressed")
+    if writable or compression != b"uncompressed":
+        return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+    # The buffers of an uncompressed table are slices of the mapping, only paged in when used; reading a selection
+    # of the columns directly would copy them.
+    arrow_table = reader.read_all()
+    if columns is not None:
+        arrow_table = arrow_table.select(columns)
+    return arrow_table.to_pandas(split_blocks=True, types_mapper=_pandas_dtype)
+
+
+def read_object_types(ocel_path):
+    objects = read_table(ocel_path, "objects", columns=[constants.DEFAULT_OBJECT_TYPE])
+    return sorted(objects[constants.DEFAULT_OBJECT_TYPE].unique().tolist())
+
+
+def load_ocel(ocel_path, full=False):
+    """
+    Loads a stored OCEL. Unless full is set, only the columns needed by the mining pipeline are read, and they are
+    read-only where they map the stored tables.
+    """
+    tables = {}
+    for table in OCEL_TABLES:
+        if full:
+            tables[table] = read_table(ocel_path, table)
+        elif table in MINING_COLUMNS:
+            tables[table] = read_table(ocel_path, table, columns=MINING_COLUMNS[table], writable=False)
+
+    with open(os.path.join(ocel_path, GLOBALS_FILE)) as f:
+        tables["globals"] = json.load(f)
+
+    return OCEL(**tables)
+
+
+def remove_artifact(path):
+    if not path:
+        return
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.isfile(path):
+        os.remove(path)
+
+
+def artifact_size(path):
+    if os.path.isdir(path):
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+    return os.path.getsize(path)
+
+
+def file_version(stat):
+    """
+    Identifies the content of an artifact from its stat: stored artifacts are immutable and replaced files get a new
+    inode.
+    """
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def touch(path):
+    """
+    Records an access to an artifact in its access time, keeping its modification time, which identifies its
+    version, as is. Access times are set explicitly, so this does not depend on the atime options of the mount.
+    """
+    stat = os.stat(path)
+    os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+
+
+def memory_size(value, stored_size):
+    """
+    Estimated size in memory of a loaded artifact: the deep size of the tables of an OCEL, the size of strings and
+    arrays, and the size of the stored file for the models, which are stored pickled.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+    if isinstance(value, OCEL):
+        return sum(memory_size(getattr(value, table), stored_size) for table in OCEL_TABLES)
+    if isinstance(value, dict) and value and all(isinstance(item, np.ndarray) for item in value.values()):
+        return sum(item.nbytes for item in value.values())
+    return stored_size
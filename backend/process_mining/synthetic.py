@@ -0,0 +1,89 @@
+import json
+import random
+from datetime import datetime, timedelta
+
+START_TIME = datetime(2024, 1, 1)
+
+
+def _generate(events, objects, object_types, activities, density, seed):
+    """
+    Yields the objects (id, type) and then the events (id, activity, timestamp, related object ids) of a synthetic
+    log. Every event is triggered by a lead object, whose activity is the next step of the lead object's lifecycle, and
+    relates on average density objects.
+    """
+    rng = random.Random(seed)
+    types = [f"type{i}" for i in range(object_types)]
+    alphabet = [f"activity{i}" for i in range(activities)]
+
+    object_ids = [f"o{i}" for i in range(objects)]
+    object_type = {oid: types[i % object_types] for i, oid in enumerate(object_ids)}
+    lifecycle = {oid: 0 for oid in object_ids}
+
+    timestamp = START_TIME
+    event_list = []
+    for i in range(events):
+        lead = rng.choice(object_ids)
+        activity = alphabet[lifecycle[lead] % activities]
+        lifecycle[lead] += 1
+
+        related = {lead}
+        for _ in range(max(0, round(rng.expovariate(1 / density)) - 1) if density > 1 else 0):
+            related.add(rng.choice(object_ids))
+
+        timestamp += timedelta(seconds=rng.randint(1, 600))
+        event_list.append((f"e{i}", activity, timestamp, sorted(related)))
+
+    return types, alphabet, object_type, event_list
+
+
+def write_ocel1(path, events, objects, object_types=3, activities=10, density=2.0, seed=0):
+    types, _, object_type, event_list = _generate(events, objects, object_types, activities, density, seed)
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"ocel:global-log": ')
+        json.dump({"ocel:attribute-names": [], "ocel:object-types": types, "ocel:version": "1.0",
+                   "ocel:ordering": "timestamp"}, f)
+        f.write(', "ocel:global-event": {"ocel:activity": "__INVALID__"}')
+        f.write(', "ocel:global-object": {"ocel:type": "__INVALID__"}')
+        f.write(', "ocel:events": {')
+        for i, (eid, activity, timestamp, related) in enumerate(event_list):
+            if i:
+                f.write(", ")
+            f.write(f"{json.dumps(eid)}: ")
+            json.dump({"ocel:activity": activity, "ocel:timestamp": timestamp.isoformat(), "ocel:omap": related,
+                       "ocel:vmap": {}}, f)
+        f.write('}, "ocel:objects": {')
+        for i, (oid, ot) in enumerate(object_type.items()):
+            if i:
+                f.write(", ")
+            f.write(f"{json.dumps(oid)}: ")
+            json.dump({"ocel:type": ot, "ocel:ovmap": {}}, f)
+        f.write("}}")
+
+
+def write_ocel2(path, events, objects, object_types=3, activities=10, density=2.0, seed=0):
+    types, alphabet, object_type, event_list = _generate(events, objects, object_types, activities, density, seed)
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"objectTypes": ')
+        json.dump([{"name": ot, "attributes": []} for ot in types], f)
+        f.write(', "eventTypes": ')
+        json.dump([{"name": act, "attributes": []} for act in alphabet], f)
+        f.write(', "objects": [')
+        for i, (oid, ot) in enumerate(object_type.items()):
+            if i:
+                f.write(", ")
+            json.dump({"id": oid, "type": ot, "attributes": [], "relationships": []}, f)
+        f.write('], "events": [')
+        for i, (eid, activity, timestamp, related) in enumerate(event_list):
+            if i:
+                f.write(", ")
+            json.dump({"id": eid, "type": activity, "time": timestamp.isoformat(), "attributes": [],
+                       "relationships": [{"objectId": oid, "qualifier": ""} for oid in related]}, f)
+        f.write("]}")
+
+
+WRITERS = {
+    "ocel1": write_ocel1,
+    "ocel2": write_ocel2,
+}
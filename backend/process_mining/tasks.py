@@ -0,0 +1,268 @@
+import logging
+import os
+
+import pm4py
+from celery import shared_task
+from django.conf import settings
+
+from .cache import artifact_cache, render_cache
+from .incremental import merge_delta, update_ocdfg, history_share
+from .lifecycle import delete_expired_uploads, enforce_global_quota, sweep_orphans
+from .metrics import timed_stage, ocel_size
+from .models import FileMetadata, UploadSession
+from .storage import store_ocel, load_ocel, remove_artifact
+from .uploads import UploadStream, register_duplicate
+from .utils import read_ocel_file, discover, discover_approximate, serialize_in_file, deserialize_file, \
+    filter_ocel_ocdfg, discover_ocdfg, render_default_ocdfg, render_key, load_ocdfg, DEFAULT_OCDFG_FILTERS
+
+logger = logging.getLogger(__name__)
+
+STAGE_PARSING = "parsing"
+STAGE_DISCOVERING = "discovering"
+STAGE_RENDERING = "rendering"
+
+
+def _discover_and_store(task, ocel, file_name, user_id, content_hash, approximate=False):
+    object_types = pm4py.ocel_get_object_types(ocel)
+    codec = settings.ARTIFACT_CODEC
+    ocel_path = ocdfg_path = None
+    try:
+        with timed_stage("store", ocel_size(ocel)):
+            ocel_path = store_ocel(ocel, codec)
+
+        task.update_state(state="PROGRESS", meta={'stage': STAGE_DISCOVERING})
+        ocdfg = discover_approximate(ocel) if approximate else discover(ocel, True)
+        ocdfg_path = serialize_in_file(ocdfg, codec)
+
+        task.update_state(state="PROGRESS", meta={'stage': STAGE_RENDERING})
+        params, ocdfg = filter_ocel_ocdfg(ocel, ocdfg, DEFAULT_OCDFG_FILTERS)
+        graph_data = discover_ocdfg(ocdfg, params)
+
+        file_metadata = FileMetadata.objects.create(
+            ocel_path=ocel_path,
+            file_name=file_name,
+            username_id=user_id,
+            ocdfg_path=ocdfg_path,
+            object_types=object_types,
+            content_hash=content_hash,
+            ocdfg_approximate=approximate,
+            artifact_codec=codec
+        )
+    except Exception:
+        # Nothing refers to the artifacts yet.
+        remove_artifact(ocel_path)
+        remove_artifact(ocdfg_path)
+        raise
+
+    # Renderings of an approximate model are not cached, the exact model replaces it shortly.
+    if approximate:
+        discover_exact_ocdfg.delay(file_metadata.id)
+    else:
+        render_cache.put(file_metadata.id, "ocdfg", render_key(file_metadata, "ocdfg_path", DEFAULT_OCDFG_FILTERS),
+                         graph_data)
+
+    return {
+        'graph': graph_data,
+        'file_metadata_id': file_metadata.id,
+        'objects': object_types,
+        'approximate': approximate,
+        'approximation': ocdfg.get("approximation")
+    }
+
+
+def _remove_upload(upload_path):
+    if os.path.exists(upload_path):
+        os.remove(upload_path)
+    UploadSession.objects.filter(upload_path=upload_path).delete()
+
+
+def _duplicate_result(duplicate):
+    logger.info(f"Upload has the same content as file {duplicate.id}, reusing its artifacts.")
+    return {
+        'graph': render_default_ocdfg(duplicate),
+        'file_metadata_id': duplicate.id,
+        'objects': duplicate.object_types,
+        'approximate': duplicate.ocdfg_approximate
+    }
+
+
+@shared_task(bind=True)
+def process_uploaded_ocel(self, upload_path, file_name, user_id=None, content_hash=None, approximate=False):
+    """
+    Discovers the processes of an uploaded log, or reuses the artifacts of a stored log of the same content.
+    """
+    try:
+        duplicate = register_duplicate(content_hash, file_name, user_id) if content_hash else None
+        if duplicate is not None:
+            self.update_state(state="PROGRESS", meta={'stage': STAGE_RENDERING})
+            return _duplicate_result(duplicate)
+
+        self.update_state(state="PROGRESS", meta={'stage': STAGE_PARSING})
+        ocel = read_ocel_file(upload_path)
+        result = _discover_and_store(self, ocel, file_name, user_id, content_hash, approximate)
+    except Exception as e:
+        logger.error(f"Error processing uploaded file {file_name}: {str(e)}")
+        raise
+    finally:
+        _remove_upload(upload_path)
+
+    logger.info("Discovered processes successfully.")
+    return result
+
+
+@shared_task(bind=True)
+def process_chunked_upload(self, upload_id):
+    """
+    Parses a chunked upload from the chunks received so far, waiting for the next ones until the upload is
+    completed, then discovers its processes. Gives the upload up when its chunks stop arriving, it is then processed
+    once completed.
+    """
+    session = UploadSession.objects.get(pk=upload_id)
+    stream = None
+    try:
+        self.update_state(state="PROGRESS", meta={'stage': STAGE_PARSING})
+        stream = UploadStream(session)
+        with stream:
+            ocel = read_ocel_file(stream)
+            content_hash = stream.hexdigest()
+
+        duplicate = register_duplicate(content_hash, session.file_name, session.username_id)
+        if duplicate is not None:
+            result = _duplicate_result(duplicate)
+        else:
+            result = _discover_and_store(self, ocel, session.file_name, session.username_id, content_hash,
+                                         session.approximate)
+    except Exception as e:
+        if stream is not None and stream.released:
+            logger.info(f"No chunk of {session.file_name} received for a while, it is processed once completed.")
+            return None
+        logger.error(f"Error processing uploaded file {session.file_name}: {str(e)}")
+        raise
+    finally:
+        if stream is None or not stream.released:
+            _remove_upload(session.upload_path)
+
+    logger.info("Discovered processes successfully.")
+    return result
+
+
+@shared_task
+def discover_exact_ocdfg(file_metadata_id):
+    """
+    Replaces the approximate OCDFG of a file, and of the files sharing it, by the OCDFG of the whole log.
+    """
+    try:
+        file_metadata = FileMetadata.objects.get(id=file_metadata_id, ocdfg_approximate=True)
+    except FileMetadata.DoesNotExist:
+        return
+
+    approximate_path = file_metadata.ocdfg_path
+    ocdfg_path = serialize_in_file(discover(load_ocel(file_metadata.ocel_path), True), file_metadata.artifact_codec)
+
+    shared = FileMetadata.objects.filter(ocdfg_path=approximate_path)
+    file_ids = list(shared.values_list("id", flat=True))
+    shared.update(ocdfg_path=ocdfg_path, ocdfg_approximate=False)
+
+    if not file_ids:
+        remove_artifact(ocdfg_path)
+        return
+    for file_id in file_ids:
+        render_cache.purge(file_id)
+    remove_artifact(approximate_path)
+    logger.info(f"Replaced the approximate OCDFG of files {file_ids} by the exact one.")
+
+
+@shared_task(bind=True)
+def append_to_ocel(self, file_metadata_id, upload_path):
+    """
+    Appends the new events of a delta log to a stored log and updates its OCDFG, incrementally unless the objects of
+    the delta hold a large share of the log. The OCPN is rediscovered on demand.
+    """
+    try:
+        file_metadata = FileMetadata.objects.get(id=file_metadata_id)
+        self.update_state(state="PROGRESS", meta={'stage': STAGE_PARSING})
+        delta = read_ocel_file(upload_path)
+        if os.path.isdir(file_metadata.ocel_path):
+            ocel = load_ocel(file_metadata.ocel_path, full=True)
+        else:
+            ocel = deserialize_file(file_metadata.ocel_path)
+
+        with timed_stage("append_merge", ocel_size(delta)):
+            merged, appended = merge_delta(ocel, delta)
+        if appended is None:
+            return {
+                'graph': render_default_ocdfg(file_metadata),
+                'file_metadata_id': file_metadata.id,
+                'objects': file_metadata.object_types,
+                'appended_events': 0,
+                'incremental': False
+            }
+
+        self.update_state(state="PROGRESS", meta={'stage': STAGE_DISCOVERING})
+        incremental = bool(file_metadata.ocdfg_path) and not file_metadata.ocdfg_approximate and \
+            history_share(ocel, appended) <= settings.INCREMENTAL_DISCOVERY_MAX_SHARE
+        if incremental:
+            with timed_stage("discover_ocdfg_incremental", ocel_size(appended)):
+                ocdfg = update_ocdfg(load_ocdfg(file_metadata, ocel), ocel, merged, appended)
+        else:
+            ocdfg = discover(merged, True)
+
+        codec = settings.ARTIFACT_CODEC
+        ocel_path = ocdfg_path = None
+        try:
+            with timed_stage("store", ocel_size(merged)):
+                ocel_path = store_ocel(merged, codec)
+            ocdfg_path = serialize_in_file(ocdfg, codec)
+
+            # The content no longer matches the uploaded file, nor the files sharing its artifacts.
+            file_metadata.object_types = pm4py.ocel_get_object_types(merged)
+            file_metadata.content_hash = None
+            file_metadata.ocdfg_approximate = False
+            file_metadata.artifact_codec = codec
+            file_metadata.replace_artifacts(ocel_path=ocel_path, ocdfg_path=ocdfg_path, ocpn_path=None)
+        except Exception:
+            remove_artifact(ocel_path)
+            remove_artifact(ocdfg_path)
+            raise
+        artifact_cache.invalidate(file_metadata.id)
+        render_cache.purge(file_metadata.id)
+
+        self.update_state(state="PROGRESS", meta={'stage': STAGE_RENDERING})
+        graph_data = render_default_ocdfg(file_metadata)
+    except Exception as e:
+        logger.error(f"Error appending to file {file_metadata_id}: {str(e)}")
+        raise
+    finally:
+        _remove_upload(upload_path)
+
+    logger.info(f"Appended {len(appended.events)} events to file {file_metadata_id}.")
+    return {
+        'graph': graph_data,
+        'file_metadata_id': file_metadata.id,
+        'objects': file_metadata.object_types,
+        'appended_events': len(appended.events),
+        'incremental': incremental
+    }
+
+
+@shared_task
+def free_storage(incoming_bytes):
+    """
+    Evicts the least recently used derived artifacts until an upload of incoming_bytes fits in the global storage
+    quota.
+    """
+    usage = enforce_global_quota(incoming_bytes)
+    logger.info(f"Made room for {incoming_bytes} bytes, {usage} bytes in use")
+
+
+@shared_task
+def sweep_storage():
+    """
+    Periodic storage maintenance: deletes the expired anonymous uploads, removes the orphaned artifacts and evicts the
+    least recently used derived artifacts above the global quota.
+    """
+    deleted = delete_expired_uploads()
+    reclaimed = sweep_orphans()
+    usage = enforce_global_quota()
+    logger.info(f"Storage sweep: deleted {deleted} expired files, reclaimed {reclaimed} bytes of orphaned artifacts"
+                + (f", {usage} bytes in use" if usage is not None else ""))
@@ -1,3 +1,108 @@
+import os
+import tempfile
+
+import pm4py
 from django.test import TestCase
+from pm4py.objects.ocel.obj import OCEL
+
+from .comparison import first_difference
+from .incremental import merge_delta, update_ocdfg
+from .ocdfg import compact_ocdfg
+from .ocdfg_engines import discover_pandas, discover_pm4py
+from .synthetic import write_ocel1, write_ocel2
+from .utils import read_ocel_file
+
+
+def _with_tied_timestamps(ocel, frequency="3h"):
+    """
+    The log with its timestamps floored to the frequency, so that consecutive events of an object share their
+    timestamp, and its relations in reverse order.
+    """
+    events = ocel.events.copy()
+    events[ocel.event_timestamp] = events[ocel.event_timestamp].dt.floor(frequency)
+    relations = ocel.relations.copy()
+    relations[ocel.event_timestamp] = relations[ocel.event_timestamp].dt.floor(frequency)
+    return OCEL(events=events, objects=ocel.objects, relations=relations.iloc[::-1].reset_index(drop=True),
+                globals=ocel.globals)
+
+
+def _log_before(ocel, share):
+    """
+    The log restricted to the events of the first share of its time span, with the relations and objects of these.
+    """
+    timestamps = ocel.events[ocel.event_timestamp]
+    cutoff = timestamps.min() + (timestamps.max() - timestamps.min()) * share
+    events = ocel.events[timestamps < cutoff]
+    relations = ocel.relations[ocel.relations[ocel.event_id_column].isin(events[ocel.event_id_column])]
+    objects = ocel.objects[ocel.objects[ocel.object_id_column].isin(relations[ocel.object_id_column])]
+    return OCEL(events=events.reset_index(drop=True), objects=objects.reset_index(drop=True),
+                relations=relations.reset_index(drop=True), globals=ocel.globals)
+
+
+def _synthetic_log(writer, **options):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "log.jsonocel")
+        writer(path, **options)
+        return read_ocel_file(path)
+
+
+class OCDFGEngineEquivalenceTest(TestCase):
+    """
+    The OCDFG engines give the compact OCDFG of pm4py's own discovery on synthetic logs.
+    """
+
+    def assertSameOCDFG(self, ocel):
+        expected = compact_ocdfg(pm4py.discover_ocdfg(ocel))
+        for engine in (discover_pm4py, discover_pandas):
+            with self.subTest(engine=engine.__name__):
+                self.assertIsNone(first_difference(expected, engine(ocel)))
+
+    def test_ocel1(self):
+        self.assertSameOCDFG(_synthetic_log(write_ocel1, events=2000, objects=200, seed=1))
+
+    def test_ocel2(self):
+        self.assertSameOCDFG(_synthetic_log(write_ocel2, events=2000, objects=200, seed=2))
+
+    def test_dense_relations(self):
+        self.assertSameOCDFG(_synthetic_log(write_ocel2, events=1500, objects=50, object_types=5, density=6.0,
+                                                 seed=3))
+
+    def test_single_object_type(self):
+        self.assertSameOCDFG(_synthetic_log(write_ocel1, events=1000, objects=100, object_types=1, seed=4))
+
+    def test_tied_timestamps(self):
+        ocel = _with_tied_timestamps(_synthetic_log(write_ocel2, events=3000, objects=300, seed=5))
+        self.assertSameOCDFG(ocel)
+
+    def test_durations_match_edge_counts(self):
+        ocel = _with_tied_timestamps(_synthetic_log(write_ocel1, events=2000, objects=200, seed=6))
+        ocdfg = discover_pandas(ocel)
+        for metric in ("event_couples", "total_objects"):
+            for ot, edges in ocdfg["edges"][metric].items():
+                for edge, count in edges.items():
+                    self.assertEqual(len(ocdfg["edges_performance"][metric][ot][edge]), count)
+
+
+class IncrementalDiscoveryTest(TestCase):
+    """
+    Updating the stored OCDFG of a log with appended events gives the OCDFG discovered on the merged log.
+    """
+
+    def assertSameUpdate(self, ocel, share):
+        log = _log_before(ocel, share)
+        merged, appended = merge_delta(log, ocel)
+        expected = discover_pandas(merged)
+        for stored in ("compact", "legacy"):
+            with self.subTest(stored=stored):
+                ocdfg = discover_pandas(log) if stored == "compact" else pm4py.discover_ocdfg(log)
+                self.assertIsNone(first_difference(expected, update_ocdfg(ocdfg, log, merged, appended)))
+
+    def test_append(self):
+        self.assertSameUpdate(_synthetic_log(write_ocel2, events=2000, objects=200, seed=7), 0.8)
+
+    def test_append_to_most_objects(self):
+        self.assertSameUpdate(_synthetic_log(write_ocel1, events=2000, objects=100, seed=8), 0.3)
 
-# Create your tests here.
+    def test_append_dense_relations(self):
+        self.assertSameUpdate(_synthetic_log(write_ocel2, events=1500, objects=50, object_types=5, density=6.0,
+                                             seed=9), 0.6)
@@ -0,0 +1,100 @@
+import os
+
+import numpy as np
+import pandas as pd
+from pm4py.objects.ocel.obj import OCEL
+
+TIME_INDEX_FILE = "time_index.npz"
+
+
+def nanoseconds(timestamps):
+    return pd.to_datetime(timestamps, utc=True).astype("int64").to_numpy()
+
+
+def to_nanoseconds(value):
+    """
+    UTC nanoseconds of a time bound given as a datetime or an ISO 8601 string, naive values being taken as UTC.
+    """
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize("UTC")
+    return timestamp.value
+
+
+def build_time_index(ocel):
+    """
+    Indexes the events and the relations of the OCEL by timestamp: the row positions of both tables in timestamp
+    order along with their sorted timestamps, and for every relation in that order the row position of its object in
+    the object table, so that a time window is a binary search and a slice.
+    """
+    event_timestamps = nanoseconds(ocel.events[ocel.event_timestamp])
+    event_order = np.argsort(event_timestamps, kind="stable")
+
+    relation_timestamps = nanoseconds(ocel.relations[ocel.event_timestamp])
+    relation_order = np.argsort(relation_timestamps, kind="stable")
+    object_rows = pd.Index(ocel.objects[ocel.object_id_column]).get_indexer(
+        ocel.relations[ocel.object_id_column].to_numpy()[relation_order])
+
+    return {
+        "event_order": event_order,
+        "event_timestamps": event_timestamps[event_order],
+        "relation_order": relation_order,
+        "relation_timestamps": relation_timestamps[relation_order],
+        "relation_objects": object_rows,
+    }
+
+
+def write_time_index(ocel_path, index):
+    np.savez(os.path.join(ocel_path, TIME_INDEX_FILE), **index)
+
+
+def read_time_index(path):
+    with np.load(path) as index:
+        return {key: index[key] for key in index.files}
+
+
+def _isoformat(nanoseconds):
+    return pd.Timestamp(int(nanoseconds), tz="UTC").isoformat()
+
+
+def time_range(index):
+    """
+    Timestamps of the first and the last event of the indexed log, as UTC ISO 8601 strings, or None for an empty log.
+    """
+    timestamps = index["event_timestamps"]
+    if len(timestamps) == 0:
+        return None
+    return [_isoformat(timestamps[0]), _isoformat(timestamps[-1])]
+
+
+def time_window(ocel, index, start=None, end=None):
+    """
+    Sub-log of the events whose timestamp lies in [start, end), with their relations and related objects. An open
+    bound is given as None.
+    """
+    start = np.iinfo(np.int64).min if start is None else to_nanoseconds(start)
+    end = np.iinfo(np.int64).max if end is None else to_nanoseconds(end)
+
+    first, last = np.searchsorted(index["event_timestamps"], [start, end], side="left")
+    events = ocel.events.iloc[index["event_order"][first:last]]
+
+    first, last = np.searchsorted(index["relation_timestamps"], [start, end], side="left")
+    relations = ocel.relations.iloc[index["relation_order"][first:last]]
+    object_rows = index["relation_objects"][first:last]
+    objects = ocel.objects.iloc[np.unique(object_rows[object_rows >= 0])]
+
+    return OCEL(events=events.reset_index(drop=True), objects=objects.reset_index(drop=True),
+                relations=relations.reset_index(drop=True), globals=ocel.globals)
+
+
+def parse_time_range(start=None, end=None):
+    """
+    Normalized [start, end) range of the given bounds, as UTC ISO 8601 strings, or None if neither is given.
+    """
+    if not start and not end:
+        return None
+
+    bounds = [to_nanoseconds(bound) if bound else None for bound in (start, end)]
+    if None not in bounds and bounds[0] >= bounds[1]:
+        raise ValueError("The start of the time range must precede its end")
+    return [_isoformat(bound) if bound is not None else None for bound in bounds]
@@ -0,0 +1,149 @@
+import hashlib
+import io
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+
+from .models import FileMetadata, UploadSession
+
+READ_SIZE = 1024 * 1024
+SPOOL_SIZE = 8 * 1024 * 1024
+POLL_INTERVAL = 1
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def register_duplicate(content_hash, file_name, user_id):
+    """
+    Creates the FileMetadata of an upload sharing the stored artifacts of an already processed file with the same
+    content, if there is one.
+    """
+    # The OCDFG of the original may have been evicted, it is then rediscovered from the shared log on access.
+    original = FileMetadata.objects.filter(content_hash=content_hash).first()
+    if original is None:
+        return None
+
+    return FileMetadata.objects.create(
+        ocel_path=original.ocel_path,
+        file_name=file_name,
+        username_id=user_id,
+        ocdfg_path=original.ocdfg_path,
+        ocpn_path=original.ocpn_path,
+        object_types=original.object_types,
+        content_hash=content_hash,
+        ocdfg_approximate=original.ocdfg_approximate,
+        artifact_codec=original.artifact_codec
+    )
+
+
+def append_chunk(session, stream, checksum):
+    """
+    Writes the chunk read from stream at the current offset of the upload, once its SHA-256 checksum has been
+    verified, and advances the offset.
+    """
+    digest = hashlib.sha256()
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE, dir=settings.UPLOAD_ROOT) as chunk:
+        for block in iter(lambda: stream.read(READ_SIZE), b""):
+            digest.update(block)
+            chunk.write(block)
+        length = chunk.tell()
+
+        if digest.hexdigest() != checksum.lower():
+            raise ValueError("Chunk checksum mismatch")
+        if session.offset + length > session.size:
+            raise ValueError("Chunk exceeds the announced file size")
+
+        chunk.seek(0)
+        with open(session.upload_path, "r+b") as f:
+            f.seek(session.offset)
+            shutil.copyfileobj(chunk, f, READ_SIZE)
+            f.truncate()
+
+    session.offset += length
+    UploadSession.objects.filter(pk=session.pk).update(offset=session.offset)
+    return session.offset
+
+
+class UploadStream(io.RawIOBase):
+    """
+    Read-only view of a chunked upload that is still being received: reads never go past the bytes acknowledged so
+    far and block until more chunks arrive or the upload is completed. The content is hashed as it is read.
+
+    When no chunk arrives for idle_timeout seconds, the upload is released: its session no longer refers to the
+    reading job, so that it is processed from the file once completed, and the read raises a TimeoutError.
+    """
+
+    def __init__(self, session, idle_timeout=None):
+        self.session_id = session.pk
+        self.idle_timeout = settings.CHUNKED_UPLOAD_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        self._file = open(session.upload_path, "rb")
+        self._available = 0
+        self._digest = hashlib.sha256()
+        self._hashed = 0
+        self.released = False
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def _refresh(self):
+        state = UploadSession.objects.filter(pk=self.session_id).values_list("offset", "completed").first()
+        if state is None:
+            raise ValueError("Upload session no longer exists")
+        self._available, completed = state
+        return completed
+
+    def readinto(self, b):
+        if len(b) == 0:
+            return 0
+
+        waited = 0
+        while True:
+            position = self._file.tell()
+            if position < self._available:
+                n = self._file.readinto(memoryview(b)[:min(len(b), self._available - position)])
+                # Only bytes following the hashed prefix are hashed, hexdigest reads the ones skipped by a seek.
+                if position <= self._hashed < position + n:
+                    self._digest.update(memoryview(b)[self._hashed - position:n])
+                    self._hashed = position + n
+                return n
+
+            completed = self._refresh()
+            if position < self._available:
+                continue
+            if completed:
+                return 0
+            if waited >= self.idle_timeout:
+                # Does not release an upload completed meanwhile, the completion has handed it to this job.
+                if UploadSession.objects.filter(pk=self.session_id, completed=False).update(job_id=None):
+                    self.released = True
+                    raise TimeoutError("No chunk received before the upload timed out")
+                continue
+            time.sleep(POLL_INTERVAL)
+            waited += POLL_INTERVAL
+
+    def hexdigest(self):
+        self.seek(self._hashed)
+        while self.read(READ_SIZE):
+            pass
+        return self._digest.hexdigest()
+
+    def close(self):
+        self._file.close()
+        super().close()
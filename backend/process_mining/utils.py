@@ -1,90 +1,274 @@
+import json
+import logging
 import os
 import pickle
-import tempfile
 
-import uuid
+import numpy as np
 import pm4py
+from django.conf import settings
+
+from .cache import artifact_cache, render_cache
+from .comparison import compare_ocdfgs, diff_graph, to_diff_graph_json
+from .compression import get_codec, codec_for_path
+from .metrics import timed_stage, ocel_size
+from .ocdfg import compose_ocdfg, compact_ocdfg, is_compact, to_render_model, to_graph_json, \
+    get_frequency_index, frequency_index, PERFORMANCE_MEASURES
+from .ocdfg_engines import get_ocdfg_engine
+from .ocpn import discover_ocpn
+from .readers import read_ocel
+from .sampling import sample_ocel, scale_ocdfg
+from .storage import new_artifact_path, load_ocel, touch
+from .timeindex import TIME_INDEX_FILE, build_time_index, write_time_index, read_time_index, time_window
 from pm4py.visualization.ocel.ocdfg.variants import classic
 from pm4py.visualization.ocel.ocpn.variants import wo_decoration
-from pm4py.visualization.ocel.ocdfg import visualizer
 from pm4py.visualization.ocel.ocpn import visualizer as ocpn_visualizer
 from pm4py.visualization.common import gview
 
+logger = logging.getLogger(__name__)
 
-def discover(ocel, is_ocdfg):
-    if is_ocdfg:
-        return pm4py.discover_ocdfg(ocel)
-    else:
-        return pm4py.discover_oc_petri_net(ocel, "imd")
+DEFAULT_OCDFG_FILTERS = {
+    "activity_percent": 10,
+    "path_percent": 10,
+    "selected_objects": None,
+    "annotation_type": "unique_objects",
+    "orientation": "LR",
+    "format": "svg"
+}
 
 
-def get_content(gviz , file_format="svg"):
+def read_ocel_file(source):
     try:
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            temp_path = temp_file.name
+        with timed_stage("read") as sizes:
+            ocel = read_ocel(source)
+            sizes.update(ocel_size(ocel))
+        return ocel
+    except Exception as e:
+        logger.error(f"Failed to read OCEL file: {str(e)}")
+        raise ValueError("Unable to read the provided OCEL file.")
 
-        # if is_ocdfg:
-        #     visualizer.save(gviz, temp_path)
-        # else:
-        #     ocpn_visualizer.save(gviz, temp_path)
 
-        if file_format == "html":
-            dot_bytes = gview.serialize_dot(gviz)
-            return dot_bytes.decode('utf-8')
-        else:
-            file = gviz.render(temp_path)
-            with open(file, "r") as f:
-                content = f.read()
-            return content
+class LazyOCEL:
+    """
+    Handle to a stored OCEL that is only deserialized when a filter actually needs the event log.
+    """
+
+    def __init__(self, file_id, ocel_path):
+        self.file_id = file_id
+        self.ocel_path = ocel_path
+        self._ocel = None
 
-    finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+    def load(self):
+        if self._ocel is None:
+            self._ocel = load_artifact(self.file_id, self.ocel_path)
+        return self._ocel
+
+
+def resolve_ocel(ocel):
+    if isinstance(ocel, LazyOCEL):
+        return ocel.load()
+    return ocel
+
+
+def discover(ocel, is_ocdfg):
+    ocel = resolve_ocel(ocel)
+
+    if is_ocdfg:
+        with timed_stage("discover_ocdfg", ocel_size(ocel)):
+            return get_ocdfg_engine()(ocel)
+    else:
+        with timed_stage("discover_ocpn", ocel_size(ocel)):
+            return discover_ocpn(ocel)
+
+
+def discover_approximate(ocel, fraction=None):
+    """
+    Discovers the OCDFG on a sample of the objects of the log and scales its counts back to the whole log.
+    """
+    if fraction is None:
+        fraction = settings.APPROXIMATE_SAMPLE_FRACTION
+
+    ocel = resolve_ocel(ocel)
+    with timed_stage("discover_ocdfg_approximate", ocel_size(ocel)):
+        sample, fractions = sample_ocel(ocel, fraction)
+        ocdfg = scale_ocdfg(get_ocdfg_engine()(sample), fractions,
+                            len(sample.objects) / max(1, len(ocel.objects)),
+                            len(sample.events) / max(1, len(ocel.events)))
+        ocdfg["frequency_index"] = frequency_index(ocdfg)
+        return ocdfg
+
+
+def load_time_index(ocel):
+    """
+    Time index of the events of the log, read from the stored OCEL when there is one. OCELs stored before the index
+    existed get it written on first use.
+    """
+    if isinstance(ocel, LazyOCEL) and os.path.isdir(ocel.ocel_path):
+        index_path = os.path.join(ocel.ocel_path, TIME_INDEX_FILE)
+        if not os.path.exists(index_path):
+            write_time_index(ocel.ocel_path, build_time_index(ocel.load()))
+        return artifact_cache.get_or_load(ocel.file_id, index_path, read_time_index)
+    return build_time_index(resolve_ocel(ocel))
+
+
+def select_time_window(ocel, time_range):
+    with timed_stage("time_window"):
+        window = time_window(resolve_ocel(ocel), load_time_index(ocel), *time_range)
+    if window.events.empty:
+        raise ValueError("No event in the selected time range")
+    return window
+
+
+def discover_time_window(ocel, time_range, is_ocdfg):
+    """
+    Discovers the OCDFG or the OCPN of the events in the time range [start, end) of the log. The models discovered on
+    the windows of a stored log are cached along with its renderings.
+    """
+    visualization = "ocdfg-window" if is_ocdfg else "ocpn-window"
+    if isinstance(ocel, LazyOCEL):
+        # The path of the stored log changes with its content.
+        key = {"time_range": list(time_range), "log": ocel.ocel_path}
+        model = render_cache.get(ocel.file_id, visualization, key, loader=deserialize_file)
+        if model is not None:
+            return model
+
+    model = discover(select_time_window(ocel, time_range), is_ocdfg)
+    if isinstance(ocel, LazyOCEL):
+        render_cache.put(ocel.file_id, visualization, key, pickle.dumps(model))
+    return model
+
+
+def get_content(gviz, file_format="svg"):
+    with timed_stage("render"):
+        if file_format == "html":
+            return gview.serialize_dot(gviz)
+        return gviz.pipe(format=file_format)
 
 
 def discover_oc_petri_net(ocpn, parameters):
     gviz = ocpn_visualizer.apply(ocpn, parameters=parameters)
-    return get_content(gviz, parameters.get(wo_decoration.Parameters.FORMAT))
+    return get_content(gviz, parameters.get(wo_decoration.Parameters.FORMAT)).decode('utf-8')
 
 
 def discover_ocdfg(ocdfg, parameters):
-    gviz = classic.apply(ocdfg, parameters=parameters)
-    return get_content(gviz, parameters.get(classic.Parameters.FORMAT))
+    if parameters.get(classic.Parameters.FORMAT) == "json":
+        with timed_stage("render", {"object_types": len(ocdfg["object_types"])}):
+            return json.dumps(to_graph_json(ocdfg, parameters.get(classic.Parameters.RANKDIR, "LR")))
+    model = to_render_model(ocdfg, parameters.get(classic.Parameters.PERFORMANCE_AGGREGATION_MEASURE, "mean"))
+    gviz = classic.apply(model, parameters=parameters)
+    return get_content(gviz, parameters.get(classic.Parameters.FORMAT)).decode('utf-8')
+
+
+def render_ocdfg_diff(base, other, filters):
+    """
+    Diff graph of two OCDFGs, restricted to the selected object types, as SVG or as the JSON of to_diff_graph_json.
+    """
+    base, other = (ocdfg if is_compact(ocdfg) else compact_ocdfg(ocdfg) for ocdfg in (base, other))
+    if filters.get("selected_objects"):
+        base, other = (compose_ocdfg(ocdfg, filters["selected_objects"]) for ocdfg in (base, other))
+
+    with timed_stage("compare", {"object_types": len(set(base["object_types"]) | set(other["object_types"]))}):
+        diff = compare_ocdfgs(base, other, filters.get("annotation_type", "unique_objects"),
+                              filters.get("performance_measure", "mean"))
+
+    if filters.get("format") == "json":
+        with timed_stage("render", {"object_types": len(diff["object_types"])}):
+            return json.dumps(to_diff_graph_json(diff, filters.get("orientation", "LR")))
+    graph, _, _ = diff_graph(diff, filters.get("orientation", "LR"))
+    return graph.pipe(format=filters.get("format", "svg")).decode('utf-8')
+
+
+def load_ocdfg(file_metadata, ocel=None):
+    """
+    OCDFG of a file, rediscovered from its log when it was not discovered yet or has been evicted.
+    """
+    if file_metadata.ocdfg_path:
+        try:
+            return load_artifact(file_metadata.id, file_metadata.ocdfg_path)
+        except FileNotFoundError:
+            pass
+
+    ocdfg = discover(ocel or LazyOCEL(file_metadata.id, file_metadata.ocel_path), True)
+    file_metadata.ocdfg_approximate = False
+    file_metadata.set_artifact_path("ocdfg_path", serialize_in_file(ocdfg, file_metadata.artifact_codec))
+    return ocdfg
+
+
+def load_ocpn(file_metadata, ocel=None):
+    """
+    OCPN of a file, rediscovered from its log when it was not discovered yet or has been evicted.
+    """
+    if file_metadata.ocpn_path:
+        try:
+            return load_artifact(file_metadata.id, file_metadata.ocpn_path)
+        except FileNotFoundError:
+            pass
+
+    ocpn = discover(ocel or LazyOCEL(file_metadata.id, file_metadata.ocel_path), False)
+    file_metadata.set_artifact_path("ocpn_path", serialize_in_file(ocpn, file_metadata.artifact_codec))
+    return ocpn
+
+
+def render_key(file_metadata, model_field, filters):
+    """
+    Render cache key of a rendering of a model of the file: its filters along with the paths of the model and of the
+    log it was rendered from. Artifact paths change with their content, so a rendering of replaced artifacts stored
+    after the renderings of the file were purged is never served.
+    """
+    return dict(filters, model=getattr(file_metadata, model_field), log=file_metadata.ocel_path)
+
+
+def render_default_ocdfg(file_metadata):
+    graph_data = render_cache.get(file_metadata.id, "ocdfg", render_key(file_metadata, "ocdfg_path",
+                                                                         DEFAULT_OCDFG_FILTERS))
+    if graph_data is None:
+        parameters, ocdfg = filter_ocel_ocdfg(None, load_ocdfg(file_metadata), DEFAULT_OCDFG_FILTERS)
+        graph_data = discover_ocdfg(ocdfg, parameters)
+        if not file_metadata.ocdfg_approximate:
+            render_cache.put(file_metadata.id, "ocdfg", render_key(file_metadata, "ocdfg_path", DEFAULT_OCDFG_FILTERS),
+                             graph_data)
+    return graph_data
 
 
 def filter_ocel_ocdfg(ocel, ocdfg=None, filters=None):
     if filters is None:
-        filters = {
-            "activity_percent": 10,
-            "path_percent": 10,
-            "selected_objects": None,
-            "annotation_type": "unique_objects",
-            "orientation": "LR",
-            "format": "svg"
-        }
+        filters = DEFAULT_OCDFG_FILTERS
 
-    if filters.get("selected_objects"):
-        ocel = pm4py.filter_ocel_object_types(ocel, filters["selected_objects"])
+    if filters.get("time_range"):
+        ocdfg = discover_time_window(ocel, filters["time_range"], True)
+    elif ocdfg is None:
         ocdfg = discover(ocel, True)
+    elif not is_compact(ocdfg):
+        ocdfg = compact_ocdfg(ocdfg)
+
+    if filters.get("selected_objects"):
+        ocdfg = compose_ocdfg(ocdfg, filters["selected_objects"])
+
+    annotation_type = filters.get("annotation_type", "unique_objects")
+    edge_metric = "event_couples" if annotation_type == 'events' else annotation_type
+    performance_measure = filters.get("performance_measure")
+    if performance_measure is not None:
+        if performance_measure not in PERFORMANCE_MEASURES:
+            raise ValueError("Invalid performance measure")
+        # Durations are kept per event couple and per event couple and object, not per object.
+        if edge_metric == "unique_objects":
+            edge_metric = "event_couples"
 
     activity_threshold, path_threshold = compute_percentage_thresholds(
             ocdfg,
             filters.get("activity_percent", 10),
             filters.get("path_percent", 10),
-            act_metric=filters.get("annotation_type", "unique_objects"),
-            edge_metric="event_couples" if filters.get("annotation_type") == 'events' else
-            filters.get("annotation_type"),
+            act_metric=annotation_type,
+            edge_metric=edge_metric,
     )
 
     parameters = {
         classic.Parameters.FORMAT: filters.get("format", 'svg'),
-        classic.Parameters.ANNOTATION: "frequency",
-        classic.Parameters.ACT_METRIC: filters.get("annotation_type", "unique_objects"),
-        classic.Parameters.EDGE_METRIC: "event_couples" if filters.get("annotation_type") == 'events'
-        else filters.get("annotation_type"),
+        classic.Parameters.ANNOTATION: "frequency" if performance_measure is None else "performance",
+        classic.Parameters.ACT_METRIC: annotation_type,
+        classic.Parameters.EDGE_METRIC: edge_metric,
         classic.Parameters.ACT_THRESHOLD: activity_threshold,
         classic.Parameters.EDGE_THRESHOLD: path_threshold,
-        classic.Parameters.PERFORMANCE_AGGREGATION_MEASURE: 'mean',
+        classic.Parameters.PERFORMANCE_AGGREGATION_MEASURE: performance_measure or 'mean',
         classic.Parameters.BGCOLOR: 'white',
         classic.Parameters.RANKDIR: filters.get("orientation", "LR")
     }
@@ -100,8 +284,14 @@ def filter_ocel_ocpn(ocel, ocpn=None, filters=None):
             "format": "svg",
         }
 
+    if filters.get("time_range"):
+        if filters.get("selected_objects"):
+            ocel = select_time_window(ocel, filters["time_range"])
+        else:
+            ocpn = discover_time_window(ocel, filters["time_range"], False)
+
     if filters.get("selected_objects"):
-        ocel = pm4py.filter_ocel_object_types(ocel, filters["selected_objects"])
+        ocel = pm4py.filter_ocel_object_types(resolve_ocel(ocel), filters["selected_objects"])
         ocpn = discover(ocel, False)
 
     parameters = {
@@ -113,53 +303,79 @@ def filter_ocel_ocpn(ocel, ocpn=None, filters=None):
     return parameters, ocpn
 
 
-def serialize_in_file(discovered):
-    serialized_graph_path = f"{uuid.uuid4()}.pkl"
-    with open(serialized_graph_path, 'wb') as f:
+def serialize_in_file(discovered, codec=None):
+    codec = get_codec(codec)
+    serialized_graph_path = new_artifact_path(".pkl" + codec.suffix)
+    with timed_stage("serialize"), codec.open(serialized_graph_path, 'wb') as f:
         pickle.dump(discovered, f)
     return serialized_graph_path
 
 
 def deserialize_file(serialized_graph_path):
-    with open(serialized_graph_path, 'rb') as f:
+    with codec_for_path(serialized_graph_path).open(serialized_graph_path, 'rb') as f:
         discovered = pickle.load(f)
     return discovered
 
 
-def compute_percentage_thresholds(ocdfg, activity_percent, path_percent, act_metric="events", edge_metric="event_couples"):
-    if act_metric == "events":
-        act_count = ocdfg["activities_indep"]["events"]
-    elif act_metric == "unique_objects":
-        act_count = ocdfg["activities_indep"]["unique_objects"]
-    elif act_metric == "total_objects":
-        act_count = ocdfg["activities_indep"]["total_objects"]
-    else:
-        raise ValueError("Invalid activity metric")
+def deserialize_artifact(artifact_path):
+    if os.path.isdir(artifact_path):
+        return load_ocel(artifact_path)
+    return deserialize_file(artifact_path)
 
-    if edge_metric == "event_couples":
-        edges_count = ocdfg["edges"]["event_couples"]
-    elif edge_metric == "unique_objects":
-        edges_count = ocdfg["edges"]["unique_objects"]
-    elif edge_metric == "total_objects":
-        edges_count = ocdfg["edges"]["total_objects"]
-    else:
+
+def load_artifact(file_id, artifact_path):
+    # The access time of an artifact is its last use, the storage manager evicts the least recently used models first.
+    touch(artifact_path)
+    return artifact_cache.get_or_load(file_id, artifact_path, deserialize_artifact)
+
+
+def _frequencies(ocdfg, act_metric, edge_metric):
+    index = get_frequency_index(ocdfg)
+    if act_metric not in index["activities"]:
+        raise ValueError("Invalid activity metric")
+    if edge_metric not in index["edges"]:
         raise ValueError("Invalid edge metric")
+    return index["activities"][act_metric], index["edges"][edge_metric]
+
+
+def _percentage_thresholds(frequencies, percents):
+    """
+    Frequency found at the given percentages of the frequencies sorted in descending order, for a vector of
+    percentages.
+    """
+    percents = np.asarray(percents, dtype=float)
+    if len(frequencies) == 0:
+        return np.zeros(percents.shape, dtype=np.int64)
+    cutoff_idx = np.clip((percents / 100 * len(frequencies)).astype(np.int64), 0, len(frequencies) - 1)
+    return frequencies[len(frequencies) - 1 - cutoff_idx]
+
 
-    # Calculate activity threshold
-    act_frequencies = [len(v) for v in act_count.values()]
-    sorted_act = sorted(act_frequencies, reverse=True)
-    act_cutoff_idx = int((activity_percent / 100) * len(sorted_act))
-    act_cutoff_idx = max(0, min(act_cutoff_idx, len(sorted_act)-1))
-    activity_threshold = sorted_act[act_cutoff_idx] if sorted_act else 0
-
-    # Calculate edge threshold
-    edge_frequencies = []
-    for ot in edges_count:
-        for edge in edges_count[ot]:
-            edge_frequencies.append(len(edges_count[ot][edge]))
-    sorted_edge = sorted(edge_frequencies, reverse=True)
-    edge_cutoff_idx = int((path_percent / 100) * len(sorted_edge))
-    edge_cutoff_idx = max(0, min(edge_cutoff_idx, len(sorted_edge)-1))
-    edge_threshold = sorted_edge[edge_cutoff_idx] if sorted_edge else 0
+def compute_percentage_thresholds(ocdfg, activity_percent, path_percent, act_metric="events", edge_metric="event_couples"):
+    with timed_stage("thresholds", {"object_types": len(ocdfg["object_types"])}):
+        act_frequencies, edge_frequencies = _frequencies(ocdfg, act_metric, edge_metric)
+
+        activity_threshold = int(_percentage_thresholds(act_frequencies, [activity_percent])[0])
+        edge_threshold = int(_percentage_thresholds(edge_frequencies, [path_percent])[0])
 
     return activity_threshold, edge_threshold
+
+
+def compute_threshold_steps(ocdfg, percents, act_metric="events", edge_metric="event_couples"):
+    """
+    Thresholds for a vector of percentages, along with the number of activities and edges whose frequency reaches
+    each threshold.
+    """
+    act_frequencies, edge_frequencies = _frequencies(ocdfg, act_metric, edge_metric)
+
+    activity_thresholds = _percentage_thresholds(act_frequencies, percents)
+    path_thresholds = _percentage_thresholds(edge_frequencies, percents)
+
+    return {
+        "percentages": [float(p) for p in percents],
+        "activity_thresholds": activity_thresholds.tolist(),
+        "path_thresholds": path_thresholds.tolist(),
+        "activities_remaining": (len(act_frequencies) -
+                                 np.searchsorted(act_frequencies, activity_thresholds, side="left")).tolist(),
+        "paths_remaining": (len(edge_frequencies) -
+                            np.searchsorted(edge_frequencies, path_thresholds, side="left")).tolist(),
+    }
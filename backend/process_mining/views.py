@@ -1,24 +1,89 @@
+import hashlib
+import io
 import os
 import tempfile
 import logging
 from rest_framework.authtoken.models import Token
 
 
-import pm4py
+from celery import states
+from celery.result import AsyncResult
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST
 from rest_framework import status
 from rest_framework.authentication import TokenAuthentication, SessionAuthentication
 from rest_framework.response import Response
+from rest_framework.throttling import ScopedRateThrottle
 from rest_framework.views import APIView
 
-from .models import FileMetadata
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from .models import FileMetadata, UploadSession
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 
+from .cache import artifact_cache, render_cache
+from .lifecycle import exceeds_global_quota, exceeds_user_quota, needs_eviction
+from .metrics import render_metrics
+from .ocdfg import compact_ocdfg, compose_ocdfg, is_compact
+from .readers import OCEL_EXTENSIONS, ocel_extension
 from .serializers import FileMetadataSerializer
-from .utils import discover, discover_ocdfg, discover_oc_petri_net, serialize_in_file, \
-    deserialize_file, filter_ocel_ocdfg, filter_ocel_ocpn
+from .storage import read_object_types
+from .timeindex import parse_time_range, time_range as log_time_range
+from .tasks import process_uploaded_ocel, process_chunked_upload, append_to_ocel, free_storage
+from .uploads import append_chunk, hash_file
+from .utils import discover_ocdfg, discover_oc_petri_net, filter_ocel_ocdfg, filter_ocel_ocpn, LazyOCEL, \
+    compute_threshold_steps, render_default_ocdfg, discover_time_window, load_time_index, load_ocdfg, load_ocpn, \
+    render_ocdfg_diff, render_key
 
 logger = logging.getLogger(__name__)
 
+INVALID_FORMAT_ERROR = f"Invalid file format. Only {', '.join(OCEL_EXTENSIONS)} files are allowed."
+USER_QUOTA_ERROR = "Storage quota exceeded. Delete some of your files to upload new ones."
+GLOBAL_QUOTA_ERROR = "The server is out of storage space. Please try again later."
+
+
+def _request_user(request):
+    token_key = request.META.get('HTTP_AUTHORIZATION', '').split('Token ')[-1]
+    try:
+        token = Token.objects.get(key=token_key)
+        user = token.user
+    except Token.DoesNotExist:
+        user = None
+
+    return user or (request.user if request.user.is_authenticated else None)
+
+
+def _check_quota(user, incoming_bytes):
+    """
+    Error response if storing incoming_bytes more would exceed the quota of the user or the global one.
+    """
+    if exceeds_user_quota(user, incoming_bytes):
+        logger.warning(f"Upload of {incoming_bytes} bytes rejected: quota of user {user.id} exceeded.")
+        return Response({'error': USER_QUOTA_ERROR}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    if exceeds_global_quota(incoming_bytes):
+        logger.error(f"Upload of {incoming_bytes} bytes rejected: global storage quota exceeded.")
+        return Response({'error': GLOBAL_QUOTA_ERROR}, status=status.HTTP_507_INSUFFICIENT_STORAGE)
+    if needs_eviction(incoming_bytes):
+        free_storage.delay(incoming_bytes)
+    return None
+
+
+def _approximate_requested(request):
+    return str(request.data.get('approximate', '')).lower() in ('1', 'true')
+
+
+def _register_upload(upload_path, file_name, user, size):
+    UploadSession.objects.create(file_name=file_name, username=user, upload_path=upload_path, size=size, offset=size,
+                                 completed=True)
+
+
+def _start_processing(upload_path, file_name, user_id, content_hash, approximate=False):
+    # Uploads of a stored content are recognized by the job, which reuses the artifacts and renders on the worker.
+    job = process_uploaded_ocel.delay(upload_path, file_name, user_id, content_hash, approximate)
+
+    logger.info(f"Queued processing of {file_name} as job {job.id}.")
+    return Response({'job_id': job.id}, status=status.HTTP_202_ACCEPTED)
+
 
 class UploadOCELFileView(APIView):
     permission_classes = (AllowAny,)
@@ -31,69 +96,214 @@ class UploadOCELFileView(APIView):
 
         file = request.FILES['file']
 
-        if not file.name.endswith('.jsonocel'):
-
-            logger.error("Invalid file format. Only .jsonocel files are allowed.")
-            return Response({'error': 'Invalid file format. Only .jsonocel files are allowed.'},
-                            status=status.HTTP_400_BAD_REQUEST)
+        extension = ocel_extension(file.name)
+        if extension is None:
+            logger.error(INVALID_FORMAT_ERROR)
+            return Response({'error': INVALID_FORMAT_ERROR}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            token_key = request.META.get('HTTP_AUTHORIZATION', '').split('Token ')[-1]
-            try:
-                token = Token.objects.get(key=token_key)
-                user = token.user
-            except Token.DoesNotExist:
-                user = None
+            user = _request_user(request)
+
+            quota_response = _check_quota(user, file.size)
+            if quota_response is not None:
+                return quota_response
+
+            os.makedirs(settings.UPLOAD_ROOT, exist_ok=True)
+            content_hash = hashlib.sha256()
+            with tempfile.NamedTemporaryFile(suffix=extension, dir=settings.UPLOAD_ROOT, delete=False) as temp_file:
+                for chunk in file.chunks():
+                    content_hash.update(chunk)
+                    temp_file.write(chunk)
+                temp_file_path = temp_file.name
+
+            _register_upload(temp_file_path, file.name, user, file.size)
+            return _start_processing(temp_file_path, file.name, user.id if user else None, content_hash.hexdigest(),
+                                     _approximate_requested(request))
+
+        except Exception as e:
+            logger.error(f"Error uploading file: {str(e)}")
+            return Response({'error': 'Error processing the file'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AppendOCELFileView(APIView):
+    """
+    Appends the events of a delta OCEL file to a stored log. Events already in the log are skipped.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, file_id):
+        if not FileMetadata.objects.filter(id=file_id, username=request.user).exists():
+            return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        if 'file' not in request.FILES:
+            return Response({'error': 'No file uploaded'}, status=status.HTTP_400_BAD_REQUEST)
+
+        file = request.FILES['file']
+        extension = ocel_extension(file.name)
+        if extension is None:
+            return Response({'error': INVALID_FORMAT_ERROR}, status=status.HTTP_400_BAD_REQUEST)
 
-            user = user or (request.user if request.user.is_authenticated else None)
+        quota_response = _check_quota(request.user, file.size)
+        if quota_response is not None:
+            return quota_response
 
-            with tempfile.NamedTemporaryFile(suffix=".jsonocel", delete=False) as temp_file:
+        try:
+            os.makedirs(settings.UPLOAD_ROOT, exist_ok=True)
+            with tempfile.NamedTemporaryFile(suffix=extension, dir=settings.UPLOAD_ROOT, delete=False) as temp_file:
                 for chunk in file.chunks():
                     temp_file.write(chunk)
                 temp_file_path = temp_file.name
 
-            ocel = None
+            _register_upload(temp_file_path, file.name, request.user, file.size)
+            job = append_to_ocel.delay(file_id, temp_file_path)
+        except Exception as e:
+            logger.error(f"Error uploading file: {str(e)}")
+            return Response({'error': 'Error processing the file'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        logger.info(f"Queued append of {file.name} to file {file_id} as job {job.id}.")
+        return Response({'job_id': job.id}, status=status.HTTP_202_ACCEPTED)
+
+
+class ChunkedUploadView(APIView):
+    """
+    Starts a chunked upload of a file of the given size; chunks are then sent to ChunkedUploadChunkView.
+    """
+    permission_classes = (AllowAny,)
+    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'chunked_upload'
+
+    def post(self, request):
+        file_name = request.data.get('file_name', '')
+        extension = ocel_extension(file_name)
+        if extension is None:
+            logger.error(INVALID_FORMAT_ERROR)
+            return Response({'error': INVALID_FORMAT_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            size = -1
+        if size < 0:
+            return Response({'error': 'Invalid file size'}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = _request_user(request)
+        quota_response = _check_quota(user, size)
+        if quota_response is not None:
+            return quota_response
+
+        os.makedirs(settings.UPLOAD_ROOT, exist_ok=True)
+        with tempfile.NamedTemporaryFile(suffix=extension, dir=settings.UPLOAD_ROOT, delete=False) as temp_file:
+            upload_path = temp_file.name
+
+        session = UploadSession.objects.create(file_name=file_name, username=user, upload_path=upload_path, size=size,
+                                               approximate=_approximate_requested(request))
+        # Only JSON is parsed while it arrives, the other formats are read once the upload is completed. A parsing job
+        # holds a worker while it waits for chunks, so only a few uploads in progress are parsed at once.
+        if settings.CHUNKED_UPLOAD_STREAM_PARSING and extension == '.jsonocel' and UploadSession.objects.filter(
+                completed=False, job_id__isnull=False).count() < settings.CHUNKED_UPLOAD_MAX_STREAMING:
+            job = process_chunked_upload.delay(str(session.id))
+            UploadSession.objects.filter(pk=session.pk).update(job_id=job.id)
+
+        return Response({'upload_id': session.id, 'offset': 0, 'size': size}, status=status.HTTP_201_CREATED)
+
+
+class ChunkedUploadChunkView(APIView):
+    """
+    Reports the offset from which a chunked upload has to be resumed, and appends chunks to it. A chunk is the raw
+    request body, sent with its position in the Upload-Offset header and its SHA-256 in the Upload-Checksum header.
+    """
+    permission_classes = (AllowAny,)
+    authentication_classes = [TokenAuthentication, SessionAuthentication]
+
+    def get(self, request, upload_id):
+        try:
+            session = UploadSession.objects.get(pk=upload_id, completed=False)
+        except UploadSession.DoesNotExist:
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({'upload_id': session.id, 'offset': session.offset, 'size': session.size},
+                        status=status.HTTP_200_OK)
+
+    def put(self, request, upload_id):
+        checksum = request.headers.get('Upload-Checksum')
+        try:
+            offset = int(request.headers.get('Upload-Offset'))
+        except (TypeError, ValueError):
+            offset = None
+        if offset is None or not checksum:
+            return Response({'error': 'Upload-Offset and Upload-Checksum headers are required'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
             try:
-                ocel = pm4py.read_ocel(temp_file_path)
-            except Exception as e:
-                logger.warning(f"Failed to read OCEL with pm4py.read_ocel: {str(e)}. Trying pm4py.read_ocel2.")
-                try:
-                    ocel = pm4py.read_ocel2(temp_file_path)
-                except Exception as e:
-                    logger.error(f"Failed to read OCEL with pm4py.read_ocel2: {str(e)}")
-                    raise ValueError("Unable to read the provided JSON-OCEL file.")
-
-            object_types = pm4py.ocel_get_object_types(ocel)
-            ocel_path = serialize_in_file(ocel)
-
-            ocdfg = discover(ocel, True)
-            ocdfg_path = serialize_in_file(ocdfg)
-
-            params, ocdfg = filter_ocel_ocdfg(ocel, ocdfg)
-
-            graph_data = discover_ocdfg(ocdfg, params)
-
-            file_metadata = FileMetadata.objects.create(
-                ocel_path=ocel_path,
-                file_name=file.name,
-                username=user,
-                ocdfg_path=ocdfg_path,
-                object_types=object_types
-            )
-            os.remove(temp_file_path)
+                session = UploadSession.objects.select_for_update().get(pk=upload_id, completed=False)
+            except UploadSession.DoesNotExist:
+                return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
 
-            logger.info("Discovered processes successfully.")
-            return Response({
-                'graph': graph_data,
-                'file_metadata_id': file_metadata.id,
-                'objects': object_types
-            }, status=status.HTTP_200_OK)
+            if offset != session.offset:
+                return Response({'error': 'Unexpected offset', 'offset': session.offset},
+                                status=status.HTTP_409_CONFLICT)
+
+            try:
+                new_offset = append_chunk(session, request.stream or io.BytesIO(), checksum)
+            except ValueError as e:
+                return Response({'error': str(e), 'offset': session.offset}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'upload_id': session.id, 'offset': new_offset, 'size': session.size},
+                        status=status.HTTP_200_OK)
+
+
+class ChunkedUploadCompleteView(APIView):
+    permission_classes = (AllowAny,)
+    authentication_classes = [TokenAuthentication, SessionAuthentication]
+
+    def post(self, request, upload_id):
+        try:
+            session = UploadSession.objects.get(pk=upload_id, completed=False)
+        except UploadSession.DoesNotExist:
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        if session.offset != session.size:
+            return Response({'error': 'Upload is incomplete', 'offset': session.offset},
+                            status=status.HTTP_409_CONFLICT)
+
+        if not UploadSession.objects.filter(pk=session.pk, completed=False).update(completed=True):
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        # Read after the update: the parsing job may have released the upload since it was fetched.
+        job_id = UploadSession.objects.filter(pk=session.pk).values_list('job_id', flat=True).first()
+        if job_id:
+            return Response({'job_id': job_id}, status=status.HTTP_202_ACCEPTED)
 
+        try:
+            content_hash = hash_file(session.upload_path)
+            return _start_processing(session.upload_path, session.file_name, session.username_id, content_hash,
+                                     session.approximate)
         except Exception as e:
             logger.error(f"Error uploading file: {str(e)}")
             return Response({'error': 'Error processing the file'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class UploadStatusView(APIView):
+    permission_classes = (AllowAny,)
+
+    def get(self, request, job_id):
+        job = AsyncResult(job_id)
+
+        if job.state == states.SUCCESS:
+            return Response({'job_id': job_id, 'status': 'completed', **job.result}, status=status.HTTP_200_OK)
+
+        if job.state == states.FAILURE:
+            return Response({'job_id': job_id, 'status': 'failed', 'error': 'Error processing the file'},
+                            status=status.HTTP_200_OK)
+
+        if job.state in ("PROGRESS", states.STARTED):
+            return Response({'job_id': job_id, 'status': 'running', 'stage': job.info.get('stage')},
+                            status=status.HTTP_200_OK)
+
+        return Response({'job_id': job_id, 'status': 'pending'}, status=status.HTTP_200_OK)
+
+
 class ApplyFilterView(APIView):
     permission_classes = [AllowAny]
 
@@ -117,27 +327,49 @@ def apply_ocdfg_filters_view(request):
         "orientation": 'TB' if data.get('orientation') == 'vertical' else 'LR',
         "format": data.get('format', 'svg')
     }
+    if filters["format"] == "json":
+        # The JSON graph carries every node, edge and metric, the thresholds are applied by the client.
+        for key in ("activity_percent", "path_percent", "annotation_type"):
+            filters.pop(key)
+    elif data.get('performanceMeasure'):
+        filters["performance_measure"] = data.get('performanceMeasure')
+
+    try:
+        time_range = parse_time_range(data.get('startTime'), data.get('endTime'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if time_range:
+        filters["time_range"] = time_range
 
     try:
         file_metadata = FileMetadata.objects.get(id=file_metadata_id)
-        ocel = deserialize_file(file_metadata.ocel_path)
 
-        if file_metadata.ocdfg_path:
-            ocdfg = deserialize_file(file_metadata.ocdfg_path)
-        else:
-            ocdfg = discover(ocel, True)
-            ocdfg_path = serialize_in_file(ocdfg)
-            file_metadata.ocdfg_path = ocdfg_path
-            file_metadata.save()
+        filtered_graph = render_cache.get(file_metadata.id, "ocdfg", render_key(file_metadata, "ocdfg_path", filters))
+        if filtered_graph is not None:
+            return Response({
+                'graph': filtered_graph,
+                'file_metadata_id': file_metadata_id,
+                'approximate': file_metadata.ocdfg_approximate,
+            }, status=status.HTTP_200_OK)
+
+        ocel = LazyOCEL(file_metadata.id, file_metadata.ocel_path)
+        ocdfg = load_ocdfg(file_metadata, ocel)
 
         parameters, ocdfg = filter_ocel_ocdfg(ocel, ocdfg, filters)
         filtered_graph = discover_ocdfg(ocdfg, parameters)
+        # Renderings of an approximate model are not cached, the exact model may replace it at any time.
+        if not file_metadata.ocdfg_approximate:
+            render_cache.put(file_metadata.id, "ocdfg", render_key(file_metadata, "ocdfg_path", filters),
+                             filtered_graph)
 
         return Response({
             'graph': filtered_graph,
             'file_metadata_id': file_metadata_id,
+            'approximate': file_metadata.ocdfg_approximate,
         }, status=status.HTTP_200_OK)
 
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         logger.error(f"Error applying filters: {str(e)}")
         return Response({'error': 'Error processing the file'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -153,31 +385,137 @@ def apply_ocpn_filters_view(request):
         "format": data.get('format', 'svg')
     }
 
+    try:
+        time_range = parse_time_range(data.get('startTime'), data.get('endTime'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if time_range:
+        filters["time_range"] = time_range
+
     try:
         file_metadata = FileMetadata.objects.get(id=file_metadata_id)
-        ocel = deserialize_file(file_metadata.ocel_path)
 
-        if file_metadata.ocpn_path:
-            ocpn = deserialize_file(file_metadata.ocpn_path)
-        else:
-            ocpn = discover(ocel, False)
-            ocpn_path = serialize_in_file(ocpn)
-            file_metadata.ocpn_path = ocpn_path
-            file_metadata.save()
+        filtered_graph = render_cache.get(file_metadata.id, "ocpn", render_key(file_metadata, "ocpn_path", filters))
+        if filtered_graph is not None:
+            return Response({
+                'graph': filtered_graph,
+                'file_metadata_id': file_metadata_id,
+            }, status=status.HTTP_200_OK)
 
+        ocel = LazyOCEL(file_metadata.id, file_metadata.ocel_path)
+
+        ocpn = load_ocpn(file_metadata, ocel)
         parameters, ocpn = filter_ocel_ocpn(ocel, ocpn, filters)
         filtered_graph = discover_oc_petri_net(ocpn, parameters)
+        render_cache.put(file_metadata.id, "ocpn", render_key(file_metadata, "ocpn_path", filters), filtered_graph)
 
         return Response({
             'graph': filtered_graph,
             'file_metadata_id': file_metadata_id,
         }, status=status.HTTP_200_OK)
 
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         logger.error(f"Error applying filters: {str(e)}")
         return Response({'error': 'Error processing the file'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class CompareOCDFGView(APIView):
+    """
+    Diff of the stored OCDFGs of two files: the changes of the second one relative to the first one, rendered on a
+    single graph.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        data = request.data
+        file_ids = data.get('file_metadata_ids') or []
+        if len(file_ids) != 2:
+            return Response({'error': 'Two files are required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        filters = {
+            "selected_objects": data.get('unselectedObjects'),
+            "annotation_type": data.get('annotationType', 'unique_objects'),
+            "performance_measure": data.get('performanceMeasure', 'mean'),
+            "orientation": 'TB' if data.get('orientation') == 'vertical' else 'LR',
+            "format": data.get('format', 'svg')
+        }
+
+        try:
+            files = FileMetadata.objects.in_bulk(file_ids)
+            base, other = (files[int(file_id)] for file_id in file_ids)
+        except (KeyError, TypeError, ValueError):
+            return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+        approximate = base.ocdfg_approximate or other.ocdfg_approximate
+
+        try:
+            base_ocdfg = load_ocdfg(base)
+            other_ocdfg = load_ocdfg(other)
+            # Stored with the renderings of the first file. The path of the model of the second one changes with its
+            # content, which makes the entry stale after an append.
+            cache_filters = render_key(base, "ocdfg_path",
+                                       dict(filters, compared_with=other.id, compared_model=other.ocdfg_path))
+
+            graph = render_cache.get(base.id, "ocdfg_diff", cache_filters)
+            if graph is None:
+                graph = render_ocdfg_diff(base_ocdfg, other_ocdfg, filters)
+                if not approximate:
+                    render_cache.put(base.id, "ocdfg_diff", cache_filters, graph)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Error comparing files: {str(e)}")
+            return Response({'error': 'Error processing the file'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response({
+            'graph': graph,
+            'file_metadata_ids': [base.id, other.id],
+            'approximate': approximate,
+        }, status=status.HTTP_200_OK)
+
+
+class ThresholdStepsView(APIView):
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        data = request.data
+        file_metadata_id = data.get('file_metadata_id')
+        annotation_type = data.get('annotationType', 'unique_objects')
+        percentages = data.get('percentages') or list(range(0, 101, 10))
+
+        try:
+            file_metadata = FileMetadata.objects.get(id=file_metadata_id)
+        except FileMetadata.DoesNotExist:
+            return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            ocel = LazyOCEL(file_metadata.id, file_metadata.ocel_path)
+            time_range = parse_time_range(data.get('startTime'), data.get('endTime'))
+            if time_range:
+                ocdfg = discover_time_window(ocel, time_range, True)
+            else:
+                ocdfg = load_ocdfg(file_metadata, ocel)
+            if not is_compact(ocdfg):
+                ocdfg = compact_ocdfg(ocdfg)
+            if data.get('unselectedObjects'):
+                ocdfg = compose_ocdfg(ocdfg, data.get('unselectedObjects'))
+
+            steps = compute_threshold_steps(
+                ocdfg,
+                percentages,
+                act_metric=annotation_type,
+                edge_metric="event_couples" if annotation_type == 'events' else annotation_type,
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Error computing thresholds: {str(e)}")
+            return Response({'error': 'Error processing the file'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response({'file_metadata_id': file_metadata_id, **steps}, status=status.HTTP_200_OK)
+
+
 class UserFilesView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -187,6 +525,12 @@ class UserFilesView(APIView):
         return Response(serializer.data)
 
 
+def _log_time_range(file_metadata):
+    if not os.path.isdir(file_metadata.ocel_path):
+        return None
+    return log_time_range(load_time_index(LazyOCEL(file_metadata.id, file_metadata.ocel_path)))
+
+
 class RetrieveFileView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -197,20 +541,17 @@ class RetrieveFileView(APIView):
             return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
 
         try:
-            ocdfg = deserialize_file(file_metadata.ocdfg_path)
-            filters = {
-                "activity_percent": 10,
-                "path_percent": 10,
-                "selected_objects": None,
-                "annotation_type": "unique_objects",
-                "orientation": "LR"
-            }
-            parameters, _ = filter_ocel_ocdfg(None, ocdfg, filters=filters)
-            graph_data = discover_ocdfg(ocdfg, parameters)
+            graph_data = render_default_ocdfg(file_metadata)
+            if not file_metadata.object_types and os.path.isdir(file_metadata.ocel_path):
+                file_metadata.object_types = read_object_types(file_metadata.ocel_path)
+                file_metadata.save()
+
             return Response({
                 'graph': graph_data,
                 'objects': file_metadata.object_types,
-                'file_metadata_id': file_metadata.id
+                'file_metadata_id': file_metadata.id,
+                'approximate': file_metadata.ocdfg_approximate,
+                'time_range': _log_time_range(file_metadata)
             })
         except Exception as e:
             logger.error(f"Error retrieving file: {str(e)}")
@@ -220,15 +561,8 @@ class RetrieveFileView(APIView):
         try:
             file_metadata = FileMetadata.objects.get(id=file_id, username=request.user)
 
-            for path_field in [file_metadata.ocel_path,
-                               file_metadata.ocdfg_path,
-                               file_metadata.ocpn_path]:
-                if path_field and os.path.exists(path_field):
-                    try:
-                        os.remove(path_field)
-                    except Exception as e:
-                        logger.error(f"Error deleting file {path_field}: {e}")
-
+            artifact_cache.invalidate(file_metadata.id)
+            render_cache.purge(file_metadata.id)
             file_metadata.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -236,4 +570,25 @@ class RetrieveFileView(APIView):
             return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             logger.error(f"Error deleting file: {str(e)}")
-            return Response({'error': 'Error deleting file'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({'error': 'Error deleting file'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class CacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'artifacts': artifact_cache.stats(),
+            'renders': render_cache.stats(),
+        })
+
+
+class MetricsView(APIView):
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+            return Response({'error': 'Forbidden'}, status=status.HTTP_403_FORBIDDEN)
+
+        return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
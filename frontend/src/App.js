@@ -5,6 +5,7 @@ import Login from './component/Login/Login';
 import Signup from './component/Signup/Signup';
 import VisualizationPage from './component/Visualize/VisualizationPage';
 import Dashboard from "./component/Dashboard/Dashboard";
+import ComparisonPage from "./component/Compare/ComparisonPage";
 
 export const authContext = createContext(false);
 function App() {
@@ -18,6 +19,7 @@ function App() {
                     <Route path="/signup" element={<Signup />} />
                     <Route path="/visualization" element={<VisualizationPage />} />
                     <Route path="/dashboard" element={<Dashboard />} />
+                    <Route path="/comparison" element={<ComparisonPage />} />
                 </Routes>
             </Router>
         </authContext.Provider>
@@ -0,0 +1,86 @@
+import React, { useEffect, useState } from 'react';
+import { useLocation, useNavigate } from 'react-router-dom';
+import { Box, Button, CircularProgress, FormControl, InputLabel, MenuItem, Select, Typography } from '@mui/material';
+import axios from 'axios';
+
+const ComparisonPage = () => {
+    const location = useLocation();
+    const navigate = useNavigate();
+    const { fileIds = [], fileNames = [] } = location.state || {};
+    const [graph, setGraph] = useState(null);
+    const [loading, setLoading] = useState(false);
+    const [error, setError] = useState(null);
+    const [annotationType, setAnnotationType] = useState('unique_objects');
+    const [performanceMeasure, setPerformanceMeasure] = useState('mean');
+
+    useEffect(() => {
+        if (fileIds.length !== 2) {
+            navigate('/dashboard');
+            return;
+        }
+
+        const fetchComparison = async () => {
+            try {
+                setLoading(true);
+                setError(null);
+                const token = sessionStorage.getItem('token');
+                const response = await axios.post('http://localhost:8000/compare/', {
+                    file_metadata_ids: fileIds,
+                    annotationType,
+                    performanceMeasure,
+                }, {
+                    headers: token ? { Authorization: `Token ${token}` } : {}
+                });
+                setGraph(response.data.graph);
+            } catch (error) {
+                setError(error.response?.data?.error || 'Failed to compare the files');
+            } finally {
+                setLoading(false);
+            }
+        };
+        fetchComparison();
+    }, [fileIds, annotationType, performanceMeasure, navigate]);
+
+    return (
+        <Box sx={{ minHeight: '100vh', p: 4 }}>
+            <Box sx={{ display: 'flex', alignItems: 'center', gap: 2, mb: 3 }}>
+                <Button variant="outlined" onClick={() => navigate('/dashboard')}>Back</Button>
+                <Typography variant="h5" sx={{ flexGrow: 1 }}>
+                    {fileNames[0]} → {fileNames[1]}
+                </Typography>
+                <FormControl size="small" sx={{ minWidth: 160 }}>
+                    <InputLabel>Annotation</InputLabel>
+                    <Select value={annotationType} label="Annotation"
+                            onChange={(e) => setAnnotationType(e.target.value)}>
+                        <MenuItem value="unique_objects">Unique Objects</MenuItem>
+                        <MenuItem value="total_objects">Total Objects</MenuItem>
+                        <MenuItem value="events">Events</MenuItem>
+                    </Select>
+                </FormControl>
+                <FormControl size="small" sx={{ minWidth: 140 }}>
+                    <InputLabel>Performance</InputLabel>
+                    <Select value={performanceMeasure} label="Performance"
+                            onChange={(e) => setPerformanceMeasure(e.target.value)}>
+                        <MenuItem value="mean">Mean</MenuItem>
+                        <MenuItem value="median">Median</MenuItem>
+                        <MenuItem value="p95">95th percentile</MenuItem>
+                        <MenuItem value="max">Max</MenuItem>
+                    </Select>
+                </FormControl>
+            </Box>
+
+            {loading ? (
+                <Box sx={{ display: 'flex', justifyContent: 'center', mt: 8 }}>
+                    <CircularProgress sx={{ color: '#63007C' }} />
+                </Box>
+            ) : error ? (
+                <Typography color="error" align="center">{error}</Typography>
+            ) : graph && (
+                <Box sx={{ overflow: 'auto', border: '1px solid rgba(0, 0, 0, 0.12)', borderRadius: 2 }}
+                     dangerouslySetInnerHTML={{ __html: graph }} />
+            )}
+        </Box>
+    );
+};
+
+export default ComparisonPage;
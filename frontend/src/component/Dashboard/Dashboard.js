@@ -1,6 +1,6 @@
 import React, { useEffect, useState, useContext } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { Box, Typography, List, ListItem, ListItemText, Button, CircularProgress, Avatar, ListItemAvatar, IconButton } from '@mui/material';
+import { Box, Typography, List, ListItem, ListItemText, Button, CircularProgress, Avatar, ListItemAvatar, IconButton, Checkbox } from '@mui/material';
 import InsertDriveFileIcon from '@mui/icons-material/InsertDriveFile';
 import axios from 'axios';
 import ParticlesBg from 'particles-bg';
@@ -17,6 +17,8 @@ const Dashboard = () => {
     const navigate = useNavigate();
     const { auth } = useContext(authContext);
     const [confirmDialog, setConfirmDialog] = useState({ open: false, fileId: null });
+    // Files to compare, in the order they were checked: the first one is the baseline.
+    const [compareIds, setCompareIds] = useState([]);
 
     useEffect(() => {
         if (!auth) {
@@ -94,6 +96,22 @@ const Dashboard = () => {
         }
     };
 
+    const handleCompareToggle = (fileId, event) => {
+        event.stopPropagation();
+        setCompareIds(prev => prev.includes(fileId)
+            ? prev.filter(id => id !== fileId)
+            : [...prev, fileId].slice(-2));
+    };
+
+    const handleCompare = () => {
+        navigate('/comparison', {
+            state: {
+                fileIds: compareIds,
+                fileNames: compareIds.map(id => files.find(file => file.id === id)?.file_name),
+            }
+        });
+    };
+
     const formatDate = (dateString) => {
         const options = {
             year: 'numeric',
@@ -143,20 +161,37 @@ const Dashboard = () => {
                     <Typography variant="h4" sx={{ color: 'white' }}>
                         My Process Models
                     </Typography>
-                    <Button
-                        variant="contained"
-                        onClick={() => setOpenModal(true)}
-                        sx={{
-                            bgcolor: '#63007C',
-                            '&:hover': { bgcolor: '#430054' },
-                            textTransform: 'none',
-                            borderRadius: 2,
-                            py: 1,
-                            px: 3
-                        }}
-                    >
-                        + New Upload
-                    </Button>
+                    <Box sx={{ display: 'flex', gap: 2 }}>
+                        <Button
+                            variant="contained"
+                            onClick={handleCompare}
+                            disabled={compareIds.length !== 2}
+                            sx={{
+                                bgcolor: '#63007C',
+                                '&:hover': { bgcolor: '#430054' },
+                                textTransform: 'none',
+                                borderRadius: 2,
+                                py: 1,
+                                px: 3
+                            }}
+                        >
+                            Compare
+                        </Button>
+                        <Button
+                            variant="contained"
+                            onClick={() => setOpenModal(true)}
+                            sx={{
+                                bgcolor: '#63007C',
+                                '&:hover': { bgcolor: '#430054' },
+                                textTransform: 'none',
+                                borderRadius: 2,
+                                py: 1,
+                                px: 3
+                            }}
+                        >
+                            + New Upload
+                        </Button>
+                    </Box>
                 </Box>
 
                 {loading ? (
@@ -208,6 +243,12 @@ const Dashboard = () => {
                                 onClick={() => !fileLoading && handleFileClick(file.id)}
                                 disabled={fileLoading}
                             >
+                                <Checkbox
+                                    checked={compareIds.includes(file.id)}
+                                    onClick={(e) => handleCompareToggle(file.id, e)}
+                                    disabled={fileLoading}
+                                    sx={{ '&.Mui-checked': { color: '#63007C' } }}
+                                />
                                 <ListItemAvatar>
                                     <Avatar sx={{ bgcolor: '#63007C' }}>
                                         <InsertDriveFileIcon />
@@ -1,12 +1,67 @@
 import React, { useState } from 'react';
-import { Modal, Box, Button, Typography, CircularProgress } from '@mui/material';
+import { Modal, Box, Button, Typography, CircularProgress, Checkbox, FormControlLabel } from '@mui/material';
 import axios from 'axios';
 import { useNavigate } from 'react-router-dom';
 
+const CHUNK_SIZE = 8 * 1024 * 1024;
+const CHUNKED_UPLOAD_THRESHOLD = 32 * 1024 * 1024;
+const MAX_CHUNK_RETRIES = 5;
+
+const authHeaders = () => (
+    sessionStorage.getItem('token')
+        ? { 'Authorization': `Token ${sessionStorage.getItem('token')}` }
+        : {}
+);
+
+const sha256Hex = async (buffer) => {
+    const digest = await crypto.subtle.digest('SHA-256', buffer);
+    return Array.from(new Uint8Array(digest)).map((b) => b.toString(16).padStart(2, '0')).join('');
+};
+
+const wait = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+const uploadInChunks = async (file, approximate) => {
+    const { data } = await axios.post(
+        'http://localhost:8000/upload/chunked/',
+        { file_name: file.name, size: file.size, approximate },
+        { headers: authHeaders() },
+    );
+    const chunkUrl = `http://localhost:8000/upload/chunked/${data.upload_id}/`;
+
+    let offset = data.offset;
+    let retries = 0;
+    while (offset < file.size) {
+        const chunk = await file.slice(offset, offset + CHUNK_SIZE).arrayBuffer();
+        try {
+            const response = await axios.put(chunkUrl, chunk, {
+                headers: {
+                    ...authHeaders(),
+                    'Content-Type': 'application/octet-stream',
+                    'Upload-Offset': offset,
+                    'Upload-Checksum': await sha256Hex(chunk),
+                },
+            });
+            offset = response.data.offset;
+            retries = 0;
+        } catch (error) {
+            if (retries >= MAX_CHUNK_RETRIES) throw error;
+            retries += 1;
+            await wait(2000 * retries);
+            // Resume from the offset acknowledged by the server.
+            const status = await axios.get(chunkUrl, { headers: authHeaders() });
+            offset = status.data.offset;
+        }
+    }
+
+    return axios.post(`${chunkUrl}complete/`, {}, { headers: authHeaders() });
+};
+
 const UploadModal = ({ open, setOpen }) => {
     const [file, setFile] = useState(null);
     const [loading, setLoading] = useState(false);
     const [showSpinner, setShowSpinner] = useState(false);
+    const [stage, setStage] = useState(null);
+    const [approximate, setApproximate] = useState(false);
     const navigate = useNavigate();
 
     const handleClose = () => {
@@ -24,32 +79,65 @@ const UploadModal = ({ open, setOpen }) => {
         setLoading(true);
         setShowSpinner(true);
 
-        const formData = new FormData();
-        formData.append('file', file);
+        let upload;
+        if (file.size > CHUNKED_UPLOAD_THRESHOLD) {
+            upload = uploadInChunks(file, approximate);
+        } else {
+            const formData = new FormData();
+            formData.append('file', file);
+            if (approximate) formData.append('approximate', 'true');
 
-        axios
-            .post('http://localhost:8000/upload/', formData, {
+            upload = axios.post('http://localhost:8000/upload/', formData, {
                 headers: {
                     'Content-Type': 'multipart/form-data',
-                    ...(sessionStorage.getItem('token')
-                        ? { 'Authorization': `Token ${sessionStorage.getItem('token')}` }
-                        : {})
+                    ...authHeaders(),
                 },
-            })
-            .then((response) => {
+            });
+        }
+
+        upload
+            .then((response) => pollUploadStatus(response.data.job_id))
+            .catch((error) => {
+                console.error('Error uploading file:', error);
                 setShowSpinner(false);
                 setLoading(false);
-                navigate('/visualization', {
-                    state: {
-                        graph: response.data.graph,
-                        objects: response.data.objects,
-                        file_metadata_id: response.data.file_metadata_id,
-                } });
+            });
+    };
+
+    const showGraph = (data) => {
+        setShowSpinner(false);
+        setLoading(false);
+        setStage(null);
+        navigate('/visualization', {
+            state: {
+                graph: data.graph,
+                objects: data.objects,
+                file_metadata_id: data.file_metadata_id,
+                approximate: data.approximate,
+        } });
+    };
+
+    const pollUploadStatus = (jobId) => {
+        axios
+            .get(`http://localhost:8000/upload/${jobId}/status/`)
+            .then((response) => {
+                if (response.data.status === 'completed') {
+                    showGraph(response.data);
+                } else if (response.data.status === 'failed') {
+                    console.error('Error processing file:', response.data.error);
+                    setShowSpinner(false);
+                    setLoading(false);
+                    setStage(null);
+                } else {
+                    setStage(response.data.stage || null);
+                    setTimeout(() => pollUploadStatus(jobId), 2000);
+                }
             })
             .catch((error) => {
-                console.error('Error uploading file:', error);
+                console.error('Error fetching upload status:', error);
                 setShowSpinner(false);
                 setLoading(false);
+                setStage(null);
             });
     };
 
@@ -75,7 +163,11 @@ const UploadModal = ({ open, setOpen }) => {
                     <Typography variant="h6" gutterBottom>
                         Upload OCEL File
                     </Typography>
-                    <input type="file" onChange={handleFileChange} accept=".jsonocel" />
+                    <input type="file" onChange={handleFileChange} accept=".jsonocel,.xmlocel,.sqlite" />
+                    <FormControlLabel
+                        control={<Checkbox checked={approximate} onChange={(e) => setApproximate(e.target.checked)} />}
+                        label="Quick approximate preview"
+                    />
                     <Box sx={{ marginTop: 2 }}>
                         <Button
                             variant="contained"
@@ -113,7 +205,7 @@ const UploadModal = ({ open, setOpen }) => {
                     <Box sx={{ textAlign: 'center' }}>
                         <CircularProgress sx={{ color: 'white' }} />
                         <Typography sx={{ color: 'white', marginTop: 2 }}>
-                            Processing your file...
+                            {stage ? `Processing your file (${stage})...` : 'Processing your file...'}
                         </Typography>
                     </Box>
                 </Box>
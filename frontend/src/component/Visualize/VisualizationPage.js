@@ -16,6 +16,7 @@ import {
     Checkbox,
     IconButton,
     CircularProgress,
+    TextField,
 } from '@mui/material';
 import ZoomInIcon from '@mui/icons-material/ZoomIn';
 import ZoomOutIcon from '@mui/icons-material/ZoomOut';
@@ -40,11 +41,14 @@ const VisualizationPage = () => {
     const [pathPercent, setPathPercent] = useState(10);
     const [visualizationType, setVisualizationType] = useState('ocdfg');
     const [annotationType, setAnnotationType] = useState('unique_objects');
+    const [performanceMeasure, setPerformanceMeasure] = useState('');
     const [orientation, setOrientation] = useState('horizontal');
-    const { graph, objects, file_metadata_id } = location.state || {};
+    const { graph, objects, file_metadata_id, approximate } = location.state || {};
     const [selectedObjects, setSelectedObjects] = useState(objects || []);
     const [exportFormat, setExportFormat] = useState('svg');
     const [finalFormat, setFinalFormat] = useState('svg');
+    const [startTime, setStartTime] = useState('');
+    const [endTime, setEndTime] = useState('');
 
     // State for managing the dropdown open/close
     const [anchorEl, setAnchorEl] = useState(null);
@@ -133,10 +137,14 @@ const VisualizationPage = () => {
                 pathPercent,
                 visualizationType,
                 annotationType,
+                performanceMeasure: performanceMeasure || null,
                 orientation,
                 unselectedObjects,
                 file_metadata_id,
                 format: exportFormat,
+                // The inputs hold local times, the backend expects UTC.
+                startTime: startTime ? new Date(startTime).toISOString() : null,
+                endTime: endTime ? new Date(endTime).toISOString() : null,
             })
             .then((response) => {
                 console.log('Filters applied successfully:', response.data)
@@ -151,13 +159,44 @@ const VisualizationPage = () => {
             })
             .catch((error) => {
                 console.error('Error applying filters:', error);
-                setError('Error applying filters. Please try again.');
+                setError(error.response?.data?.error || 'Error applying filters. Please try again.');
             })
             .finally(() => {
                 setLoading(false);
             });
     };
 
+    // Replace the approximate graph by the exact one once it has been discovered
+    useEffect(() => {
+        if (!approximate) return;
+
+        let timer;
+        const pollExactModel = () => {
+            axios
+                .get(`http://localhost:8000/api/files/${file_metadata_id}/`, {
+                    headers: { Authorization: `Token ${sessionStorage.getItem('token')}` },
+                })
+                .then((response) => {
+                    if (response.data.approximate) {
+                        timer = setTimeout(pollExactModel, 5000);
+                    } else {
+                        setFinalFormat('svg');
+                        navigate('/visualization', {
+                            replace: true,
+                            state: {
+                                graph: response.data.graph,
+                                objects,
+                                file_metadata_id: response.data.file_metadata_id,
+                            },
+                        });
+                    }
+                })
+                .catch((error) => console.error('Error fetching the exact model:', error));
+        };
+        timer = setTimeout(pollExactModel, 5000);
+        return () => clearTimeout(timer);
+    }, [approximate, file_metadata_id, objects, navigate]);
+
     // Render the graph
     useEffect(() => {
         if (!graph || finalFormat === 'svg') return;
@@ -274,6 +313,32 @@ const VisualizationPage = () => {
                             </FormControl>
                         )}
 
+                        {/* Performance Measure Selector for OC-DFG, replacing the edge frequencies by durations */}
+                        {visualizationType === 'ocdfg' && (
+                            <FormControl sx={{ minWidth: '150px' }}>
+                                <InputLabel sx={{ color: 'white' }}>Performance</InputLabel>
+                                <Select
+                                    value={performanceMeasure}
+                                    onChange={(event) => setPerformanceMeasure(event.target.value)}
+                                    label="Performance"
+                                    displayEmpty
+                                    sx={{
+                                        backgroundColor: '#63007C',
+                                        color: 'white',
+                                        '& .MuiSelect-icon': {
+                                            color: 'white',
+                                        },
+                                    }}
+                                >
+                                    <MenuItem value="">None</MenuItem>
+                                    <MenuItem value="mean">Mean</MenuItem>
+                                    <MenuItem value="median">Median</MenuItem>
+                                    <MenuItem value="p95">95th Percentile</MenuItem>
+                                    <MenuItem value="max">Max</MenuItem>
+                                </Select>
+                            </FormControl>
+                        )}
+
                         {/* Selector for Visualization Type */}
                         <FormControl sx={{ minWidth: '150px' }}>
                             <InputLabel sx={{ color: 'white' }}>Visualization</InputLabel>
@@ -332,6 +397,21 @@ const VisualizationPage = () => {
                                 </Select>
                             </FormControl>
                         )}
+                        {/* Time window */}
+                        {[['From', startTime, setStartTime], ['To', endTime, setEndTime]].map(([label, value, setValue]) => (
+                            <TextField
+                                key={label}
+                                label={label}
+                                type="datetime-local"
+                                value={value}
+                                onChange={(e) => setValue(e.target.value)}
+                                InputLabelProps={{ shrink: true, sx: { color: 'white' } }}
+                                sx={{
+                                    backgroundColor: '#63007C',
+                                    '& input': { color: 'white' },
+                                }}
+                            />
+                        ))}
                         {/* Multi-Select Dropdown for Objects */}
                         <>
                             <Button
@@ -417,6 +497,12 @@ const VisualizationPage = () => {
                         backgroundColor: '#f9f9f9',
                     }}
                 >
+                    {approximate && !error && (
+                        <Alert severity="info" sx={{ mb: 2 }}>
+                            This graph was discovered on a sample of the objects. The exact model is being computed
+                            and will replace it when ready.
+                        </Alert>
+                    )}
                     {error ? (
                         <Alert severity="error" sx={{ mb: 2 }} onClose={() => setError(null)}>
                             {error}